@@ -0,0 +1,271 @@
+"""
+ASGI entry point for production:
+
+    uv run alembic upgrade head
+    uv run uvicorn asgi:app --port 5001
+
+The read endpoints below run on the event loop with the async engine
+(asyncpg), so a request waiting on Postgres does not hold a thread. Every
+other route is served by the Flask app through a WSGI adapter.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+from functools import wraps
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from database import get_async_session_factory
+from models import Category, InvoiceJob, Spending
+import auth
+import data_version
+import main
+import metrics
+import reports
+import sql_profiler
+
+CORS_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
+
+
+class FlaskJSONResponse(JSONResponse):
+    # Same encoding as Flask's jsonify, so both modes return identical bodies
+    def render(self, content) -> bytes:
+        return (
+            json.dumps(content, sort_keys=True, separators=(",", ":")) + "\n"
+        ).encode()
+
+
+def token_required(endpoint):
+    @wraps(endpoint)
+    async def decorated(request):
+        current_user_id, error = auth.authenticate(request.headers)
+        if error:
+            return FlaskJSONResponse({"message": error}, status_code=401)
+
+        return await endpoint(request, current_user_id)
+
+    return decorated
+
+
+def conditional(endpoint):
+    # Same ETag and 304 handling as main.conditional
+    @wraps(endpoint)
+    async def decorated(request, current_user_id):
+        async with get_async_session_factory()() as session:
+            version = await session.scalar(
+                data_version.select_version(current_user_id)
+            )
+        if version is None:
+            return await endpoint(request, current_user_id)
+
+        request_key = f"{request.url.path}?{request.url.query}"
+        current_etag = data_version.etag(current_user_id, version, request_key)
+        headers = {"ETag": f'"{current_etag}"', "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if data_version.not_modified(if_none_match, current_etag):
+            return Response(status_code=304, headers=headers)
+
+        response = await endpoint(request, current_user_id)
+        if response.status_code == 200:
+            response.headers.update(headers)
+        return response
+
+    return decorated
+
+
+async def health(request):
+    return FlaskJSONResponse({"status": "ok"})
+
+
+@token_required
+@conditional
+async def get_categories(request, current_user_id):
+    async with get_async_session_factory()() as session:
+        user_categories = await session.scalars(
+            select(Category).where(Category.user_id == current_user_id)
+        )
+        return FlaskJSONResponse([c.to_dict() for c in user_categories])
+
+
+@token_required
+@conditional
+async def get_spendings(request, current_user_id):
+    try:
+        statement, limit = main.spendings_statement(
+            current_user_id, request.query_params
+        )
+    except ValueError as e:
+        return FlaskJSONResponse({"message": str(e)}, status_code=400)
+
+    if request.query_params.get("stream") in ("1", "true"):
+        return StreamingResponse(
+            _stream_spendings(statement), media_type="application/json"
+        )
+
+    async with get_async_session_factory()() as session:
+        rows = (await session.execute(statement)).all()
+    return FlaskJSONResponse(main.spendings_payload(rows, limit))
+
+
+async def _stream_spendings(statement):
+    async with get_async_session_factory()() as session:
+        rows = await session.stream(
+            statement.execution_options(yield_per=main.SPENDINGS_STREAM_BATCH_SIZE)
+        )
+        yield "["
+        index = 0
+        async for row in rows:
+            yield ("," if index else "") + json.dumps(Spending.row_to_dict(row))
+            index += 1
+        yield "]"
+
+
+@token_required
+@conditional
+async def get_reports_summary(request, current_user_id):
+    month = request.query_params.get("month")
+    if not month:
+        return FlaskJSONResponse(
+            {"message": "Month is required. Use YYYY-MM"}, status_code=400
+        )
+
+    try:
+        start, end = reports.month_range(month)
+    except ValueError:
+        return FlaskJSONResponse(
+            {"message": "Invalid month format. Use YYYY-MM"}, status_code=400
+        )
+
+    category_statement, daily_statement = reports.summary_statements(
+        current_user_id, start, end
+    )
+    async with get_async_session_factory()() as session:
+        category_rows = (await session.execute(category_statement)).all()
+        daily_rows = (await session.execute(daily_statement)).all()
+    return FlaskJSONResponse(reports.build_summary(start, category_rows, daily_rows))
+
+
+@token_required
+async def get_invoice_status(request, current_user_id):
+    async with get_async_session_factory()() as session:
+        job = await session.scalar(
+            select(InvoiceJob).where(
+                InvoiceJob.invoice_id == request.path_params["invoice_id"],
+                InvoiceJob.user_id == current_user_id,
+            )
+        )
+    if not job:
+        return FlaskJSONResponse({"message": "Invoice not found"}, status_code=404)
+
+    return FlaskJSONResponse(job.to_dict())
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await asyncio.to_thread(main.startup)
+    yield
+
+
+class RequestMetrics:
+    """
+    Records latency and status for a native route, under the same route
+    label the Flask app uses.
+    """
+
+    def __init__(self, app, route: str):
+        self.app = app
+        self.route = route
+
+    async def __call__(self, scope, receive, send):
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.observe_request(
+                scope["method"], self.route, status, time.perf_counter() - started
+            )
+
+
+class ProfileSQL:
+    """
+    Adds the SQL profiler headers to a native route's responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profile = sql_profiler.start(f"{scope['method']} {scope['path']}")
+        if profile is None:
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                # Statements run while streaming the body only reach the log
+                status = message["status"]
+                headers = [
+                    (name.lower().encode(), value.encode())
+                    for name, value in profile.headers().items()
+                ]
+                message = {**message, "headers": [*message["headers"], *headers]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            sql_profiler.stop()
+            profile.log(status)
+
+
+def _route(path: str, endpoint, flask_rule: str = None):
+    # Preflight requests fall through to Flask, which answers them with flask-cors
+    return Route(
+        path,
+        endpoint,
+        methods=["GET"],
+        middleware=[
+            Middleware(
+                CORSMiddleware,
+                allow_origins=CORS_ORIGINS,
+                allow_credentials=True,
+                allow_methods=["*"],
+                allow_headers=["*"],
+            ),
+            Middleware(RequestMetrics, route=flask_rule or path),
+            Middleware(ProfileSQL),
+        ],
+    )
+
+
+app = Starlette(
+    routes=[
+        _route("/health", health),
+        _route("/api/categories", get_categories),
+        _route("/api/spendings", get_spendings),
+        _route("/api/reports/summary", get_reports_summary),
+        _route(
+            "/api/invoices/{invoice_id:int}/status",
+            get_invoice_status,
+            "/api/invoices/<int:invoice_id>/status",
+        ),
+        Mount("/", app=WSGIMiddleware(main.app)),
+    ],
+    lifespan=lifespan,
+)
@@ -15,23 +15,33 @@ def generate_token(user_id):
     return jwt.encode(payload, SECRET_KEY, algorithm="HS256")
 
 
+def authenticate(headers):
+    """
+    Returns (user_id, None) for a valid bearer token, or (None, error
+    message) otherwise.
+    """
+    token = None
+    if "Authorization" in headers:
+        auth_header = headers["Authorization"]
+        if auth_header.startswith("Bearer "):
+            token = auth_header.split(" ")[1]
+
+    if not token:
+        return None, "Token is missing!"
+
+    try:
+        data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        return data["user_id"], None
+    except Exception as e:
+        return None, "Token is invalid!"
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if "Authorization" in request.headers:
-            auth_header = request.headers["Authorization"]
-            if auth_header.startswith("Bearer "):
-                token = auth_header.split(" ")[1]
-
-        if not token:
-            return jsonify({"message": "Token is missing!"}), 401
-
-        try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            current_user_id = data["user_id"]
-        except Exception as e:
-            return jsonify({"message": "Token is invalid!"}), 401
+        current_user_id, error = authenticate(request.headers)
+        if error:
+            return jsonify({"message": error}), 401
 
         return f(current_user_id, *args, **kwargs)
 
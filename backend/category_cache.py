@@ -0,0 +1,33 @@
+import os
+from models import Category
+from database import db_session
+from versioned_cache import VersionedCache
+import data_version
+
+# Users whose category map is kept in memory
+CATEGORY_CACHE_USERS = int(os.environ.get("CATEGORY_CACHE_USERS", "1000"))
+
+# user_id -> (categories version, {name: category_id})
+_maps = VersionedCache(CATEGORY_CACHE_USERS)
+
+
+def get_map(user_id: int):
+    """
+    Returns the user's {category name: id} map, from memory while their
+    categories version is unchanged. Only category creates and deletes
+    bump it, so spending writes keep hitting the cache while every process
+    still sees new categories on its next call. Callers must not modify
+    the map.
+    """
+    version = db_session.execute(
+        data_version.select_categories_version(user_id)
+    ).scalar()
+    return _maps.get(
+        user_id,
+        version,
+        lambda: dict(
+            db_session.query(Category.name, Category.id).filter(
+                Category.user_id == user_id
+            )
+        ),
+    )
@@ -0,0 +1,38 @@
+import hashlib
+from sqlalchemy import select, update
+from werkzeug.http import parse_etags
+from models import User
+from database import db_session
+
+
+def bump(user_id: int, categories: bool = False):
+    """
+    Marks the user's data as changed, and their categories too when
+    categories is set. Runs in the caller's transaction, so the new
+    version becomes visible together with the write.
+    """
+    values = {"data_version": User.data_version + 1}
+    if categories:
+        values["categories_version"] = User.categories_version + 1
+    db_session.execute(update(User).where(User.id == user_id).values(values))
+
+
+def select_version(user_id: int):
+    return select(User.data_version).where(User.id == user_id)
+
+
+def select_categories_version(user_id: int):
+    return select(User.categories_version).where(User.id == user_id)
+
+
+def etag(user_id: int, version: int, request_key: str) -> str:
+    """
+    Strong ETag for a response built from the user's data at `version`.
+    request_key (path and query string) keeps different views apart.
+    """
+    digest = hashlib.sha256(request_key.encode()).hexdigest()[:16]
+    return f"{user_id}-{version}-{digest}"
+
+
+def not_modified(if_none_match: str, current_etag: str) -> bool:
+    return bool(if_none_match) and parse_etags(if_none_match).contains(current_etag)
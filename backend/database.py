@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import scoped_session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import time
+import threading
 from dotenv import load_dotenv
+import metrics
 
 load_dotenv()
 
@@ -19,16 +24,174 @@ if DB_PASSWORD:
 else:
     DATABASE_URL = f"postgresql+psycopg2://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL)
+# Overrides the settings above, e.g. sqlite:///bench.db for local benchmarks
+DATABASE_URL = os.environ.get("DATABASE_URL", DATABASE_URL)
+
+# Connection pool, per process and per engine
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "false").lower() in ("1", "true")
+
+
+class TimedPoolMixin:
+    """
+    Tracks how many checkouts are waiting for a connection and how long
+    they waited, which QueuePool does not expose.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiting = 0
+        self.wait_seconds_total = 0.0
+        self.timeouts = 0
+        self.wait_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        with self.wait_lock:
+            self.waiting += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self.wait_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            with self.wait_lock:
+                self.waiting -= 1
+                self.wait_seconds_total += time.perf_counter() - started
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options():
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# SQLite connections are shared by the pool's threads
+_connect_args = {}
+if DATABASE_URL.startswith("sqlite"):
+    _connect_args["check_same_thread"] = False
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args=_connect_args,
+    **_pool_options(),
+)
 db_session = scoped_session(
     sessionmaker(autocommit=False, autoflush=False, bind=engine)
 )
 
+# Same database through asyncpg, for the ASGI entry point. SQLite goes
+# through aiosqlite, which only the dev dependency group installs.
+ASYNC_DATABASE_URL = DATABASE_URL.replace(
+    "postgresql+psycopg2", "postgresql+asyncpg"
+).replace("sqlite://", "sqlite+aiosqlite://")
+
+_async_engine = None
+_async_session_factory = None
+
+
+def get_async_session_factory():
+    """
+    Creates the async engine on first use, so the sync app never needs
+    asyncpg installed. Raises RuntimeError when the async driver for the
+    configured database is missing.
+    """
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        try:
+            _async_engine = create_async_engine(
+                ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool, **_pool_options()
+            )
+        except ModuleNotFoundError as e:
+            raise RuntimeError(
+                f"The ASGI app needs the {e.name} driver for this database. Use"
+                " Postgres, or install the dev dependencies (uv sync) to run it"
+                " on SQLite."
+            ) from e
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
 Base = declarative_base()
 Base.query = db_session.query_property()
 
 
+def upsert(model):
+    """
+    Returns a dialect INSERT for model that supports on_conflict_do_*().
+    """
+    if engine.dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def pool_stats():
+    """
+    Returns {engine name: pool counters} for the engines created so far.
+    """
+    engines = {"sync": engine}
+    if _async_engine is not None:
+        engines["async"] = _async_engine.sync_engine
+
+    stats = {}
+    for name, pooled_engine in engines.items():
+        pool = pooled_engine.pool
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "waiting": getattr(pool, "waiting", 0),
+            "wait_seconds_total": getattr(pool, "wait_seconds_total", 0.0),
+            "timeouts_total": getattr(pool, "timeouts", 0),
+        }
+    return stats
+
+
+def _collect_pool_metrics():
+    stats = pool_stats()
+    for key, metric_type, documentation in (
+        ("size", "gauge", "Configured pool size."),
+        ("checked_out", "gauge", "Connections checked out."),
+        ("overflow", "gauge", "Connections open beyond the pool size."),
+        ("waiting", "gauge", "Checkouts waiting for a connection."),
+        ("wait_seconds_total", "counter", "Time spent waiting for a connection."),
+        ("timeouts_total", "counter", "Checkouts that timed out."),
+    ):
+        yield (
+            f"kredit_db_pool_{key}",
+            metric_type,
+            documentation,
+            [({"engine": name}, values[key]) for name, values in stats.items()],
+        )
+
+
+metrics.register_collector(_collect_pool_metrics)
+
+
 def init_db():
     import models
 
+    if engine.dialect.name == "postgresql":
+        # Spending name search uses a trigram index
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,159 @@
+import io
+import os
+import re
+import csv
+import zlib
+from datetime import date, datetime, timezone
+from xml.sax.saxutils import escape
+from sqlalchemy import func, select
+from models import Spending
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ofx": ("application/x-ofx", "ofx"),
+}
+
+# Rows written per yielded chunk
+EXPORT_CHUNK_ROWS = 500
+
+# OFX statement currency (ISO 4217), unless the request passes ?currency=.
+# Amounts are stored without a currency; the dashboard shows them in dollars.
+EXPORT_OFX_CURRENCY = os.environ.get("EXPORT_OFX_CURRENCY", "USD")
+
+# OFX signon language (ISO 639-2)
+EXPORT_OFX_LANGUAGE = os.environ.get("EXPORT_OFX_LANGUAGE", "ENG")
+
+_CURRENCY = re.compile(r"^[A-Z]{3}$")
+
+CSV_HEADER = ["id", "date", "name", "amount", "category", "invoice_id", "import_date"]
+
+
+def export_select(user_id: int, start: date = None, end: date = None):
+    """
+    Spendings dated start..end (inclusive), oldest first, as the list
+    projection.
+    """
+    statement = Spending.projection_select().where(Spending.user_id == user_id)
+    if start:
+        statement = statement.where(Spending.date >= start)
+    if end:
+        statement = statement.where(Spending.date <= end)
+    return statement.order_by(Spending.date, Spending.id)
+
+
+def select_date_range(user_id: int):
+    """
+    First and last spending dates, for OFX statements requested without
+    an explicit range.
+    """
+    return select(func.min(Spending.date), func.max(Spending.date)).where(
+        Spending.user_id == user_id
+    )
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def csv_stream(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    yield buffer.getvalue()
+
+    for chunk in _chunks(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [
+                row.id,
+                row.date.isoformat(),
+                row.name,
+                f"{row.amount:.2f}",
+                row.category_name or "Other",
+                row.invoice_id,
+                row.import_date.isoformat(),
+            ]
+            for row in chunk
+        )
+        yield buffer.getvalue()
+
+
+def _ofx_date(day: date) -> str:
+    return day.strftime("%Y%m%d")
+
+
+def parse_currency(value: str = None) -> str:
+    """
+    Validates an ISO 4217 currency code, defaulting to EXPORT_OFX_CURRENCY.
+    Raises ValueError for anything else.
+    """
+    currency = (value or EXPORT_OFX_CURRENCY).upper()
+    if not _CURRENCY.match(currency):
+        raise ValueError("Currency must be a three-letter ISO 4217 code")
+    return currency
+
+
+def ofx_stream(rows, start: date, end: date, currency: str = None):
+    """
+    OFX 2 credit card statement in currency (EXPORT_OFX_CURRENCY by
+    default). Amounts are charges, so they are written as negative
+    TRNAMTs; the ledger balance is their sum.
+    """
+    currency = currency or EXPORT_OFX_CURRENCY
+    now = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        '<?OFX OFXHEADER="200" VERSION="211" SECURITY="NONE" '
+        'OLDFILEUID="NONE" NEWFILEUID="NONE"?>\n'
+        "<OFX><SIGNONMSGSRSV1><SONRS>"
+        "<STATUS><CODE>0</CODE><SEVERITY>INFO</SEVERITY></STATUS>"
+        f"<DTSERVER>{now}</DTSERVER><LANGUAGE>{EXPORT_OFX_LANGUAGE}</LANGUAGE>"
+        "</SONRS></SIGNONMSGSRSV1>\n"
+        "<CREDITCARDMSGSRSV1><CCSTMTTRNRS><TRNUID>0</TRNUID>"
+        "<STATUS><CODE>0</CODE><SEVERITY>INFO</SEVERITY></STATUS>"
+        f"<CCSTMTRS><CURDEF>{currency}</CURDEF>"
+        "<CCACCTFROM><ACCTID>kredit</ACCTID></CCACCTFROM>\n"
+        f"<BANKTRANLIST><DTSTART>{_ofx_date(start)}</DTSTART>"
+        f"<DTEND>{_ofx_date(end)}</DTEND>\n"
+    )
+
+    balance = 0.0
+    for chunk in _chunks(rows):
+        parts = []
+        for row in chunk:
+            balance -= row.amount
+            parts.append(
+                "<STMTTRN><TRNTYPE>DEBIT</TRNTYPE>"
+                f"<DTPOSTED>{_ofx_date(row.date)}</DTPOSTED>"
+                f"<TRNAMT>{-row.amount:.2f}</TRNAMT>"
+                f"<FITID>{escape(row.id)}</FITID>"
+                f"<NAME>{escape(row.name[:32])}</NAME>"
+                f"<MEMO>{escape(row.category_name or 'Other')}</MEMO>"
+                "</STMTTRN>\n"
+            )
+        yield "".join(parts)
+
+    yield (
+        "</BANKTRANLIST>"
+        f"<LEDGERBAL><BALAMT>{balance:.2f}</BALAMT><DTASOF>{now}</DTASOF></LEDGERBAL>"
+        "</CCSTMTRS></CCSTMTTRNRS></CREDITCARDMSGSRSV1></OFX>\n"
+    )
+
+
+def gzip_stream(chunks):
+    """
+    Compresses a text stream on the fly. Each chunk is flushed so the
+    client keeps receiving bytes while the export runs.
+    """
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
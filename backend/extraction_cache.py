@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import func
+from models import ExtractionCacheEntry
+from database import db_session, upsert
+
+# Total size of stored responses before least recently used entries are evicted
+EXTRACTION_CACHE_MAX_BYTES = int(
+    os.environ.get("EXTRACTION_CACHE_MAX_BYTES", str(50 * 1024 * 1024))
+)
+
+# Entries older than this are never served and get evicted on the next write
+EXTRACTION_CACHE_MAX_AGE_DAYS = int(os.environ.get("EXTRACTION_CACHE_MAX_AGE_DAYS", "30"))
+
+_counters = {"hits": 0, "misses": 0, "evictions": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name: str, amount: int = 1):
+    with _counters_lock:
+        _counters[name] += amount
+
+
+def content_hash(file_content) -> str:
+    """
+    Hashes bytes, or a seekable binary stream in chunks.
+    """
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(file_content).hexdigest()
+
+    digest = hashlib.sha256()
+    file_content.seek(0)
+    while chunk := file_content.read(64 * 1024):
+        digest.update(chunk)
+    file_content.seek(0)
+    return digest.hexdigest()
+
+
+def categories_hash(category_names) -> str:
+    return hashlib.sha256("\n".join(sorted(category_names)).encode()).hexdigest()
+
+
+def _expiry_cutoff():
+    return datetime.now(timezone.utc) - timedelta(days=EXTRACTION_CACHE_MAX_AGE_DAYS)
+
+
+def get(file_hash: str, categories_key: str):
+    """
+    Returns the cached parsed extraction for the file and category list,
+    or None on a miss.
+    """
+    entry = ExtractionCacheEntry.query.filter(
+        ExtractionCacheEntry.content_hash == file_hash,
+        ExtractionCacheEntry.categories_hash == categories_key,
+        ExtractionCacheEntry.created_at >= _expiry_cutoff(),
+    ).first()
+
+    if not entry:
+        _count("misses")
+        return None
+
+    entry.hits += 1
+    entry.last_used_at = datetime.now(timezone.utc)
+    db_session.commit()
+
+    _count("hits")
+    return json.loads(entry.response)
+
+
+def put(file_hash: str, categories_key: str, spendings_data):
+    """
+    Stores a parsed extraction and evicts expired or excess entries.
+    Workers that extracted the same file concurrently overwrite each
+    other's entry. Failures are logged and never fail the extraction.
+    """
+    response = json.dumps(spendings_data)
+    now = datetime.now(timezone.utc)
+    values = {
+        "response": response,
+        "size_bytes": len(response.encode()),
+        "hits": 0,
+        "created_at": now,
+        "last_used_at": now,
+    }
+
+    try:
+        db_session.execute(
+            upsert(ExtractionCacheEntry)
+            .values(content_hash=file_hash, categories_hash=categories_key, **values)
+            .on_conflict_do_update(
+                index_elements=[
+                    ExtractionCacheEntry.content_hash,
+                    ExtractionCacheEntry.categories_hash,
+                ],
+                set_=values,
+            )
+        )
+        db_session.commit()
+        evict()
+    except Exception as e:
+        print(f"Error storing extraction cache entry {file_hash}: {e}")
+        db_session.rollback()
+
+
+def evict():
+    evicted = ExtractionCacheEntry.query.filter(
+        ExtractionCacheEntry.created_at < _expiry_cutoff()
+    ).delete(synchronize_session=False)
+
+    total_bytes = (
+        db_session.query(func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0))
+        .scalar()
+    )
+    if total_bytes > EXTRACTION_CACHE_MAX_BYTES:
+        oldest_first = db_session.query(
+            ExtractionCacheEntry.content_hash,
+            ExtractionCacheEntry.categories_hash,
+            ExtractionCacheEntry.size_bytes,
+        ).order_by(ExtractionCacheEntry.last_used_at)
+
+        for file_hash, categories_key, size_bytes in oldest_first:
+            if total_bytes <= EXTRACTION_CACHE_MAX_BYTES:
+                break
+            ExtractionCacheEntry.query.filter_by(
+                content_hash=file_hash, categories_hash=categories_key
+            ).delete(synchronize_session=False)
+            total_bytes -= size_bytes
+            evicted += 1
+
+    db_session.commit()
+    _count("evictions", evicted)
+
+
+def stats():
+    entries, total_bytes, stored_hits = db_session.query(
+        func.count(),
+        func.coalesce(func.sum(ExtractionCacheEntry.size_bytes), 0),
+        func.coalesce(func.sum(ExtractionCacheEntry.hits), 0),
+    ).one()
+
+    with _counters_lock:
+        counters = dict(_counters)
+
+    return {
+        "hits": counters["hits"],
+        "misses": counters["misses"],
+        "evictions": counters["evictions"],
+        "entries": entries,
+        "size_bytes": total_bytes,
+        "max_bytes": EXTRACTION_CACHE_MAX_BYTES,
+        "total_hits": stored_hits,
+    }
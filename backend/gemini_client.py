@@ -0,0 +1,237 @@
+import os
+import time
+import asyncio
+import random
+import threading
+import metrics
+
+# google.genai and httpx are imported on first use: they take most of the
+# app's import time and only invoice processing needs them
+
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+
+# Points the client at another endpoint, e.g. scripts/fake_gemini.py
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL")
+
+# Requests per minute allowed by our quota, and calls in flight at once
+GEMINI_REQUESTS_PER_MINUTE = float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_MAX_CONCURRENCY = int(os.environ.get("GEMINI_MAX_CONCURRENCY", "4"))
+
+# Jittered exponential backoff on quota and server errors
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "4"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.environ.get("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.environ.get("GEMINI_BACKOFF_MAX_SECONDS", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Allows `rate_per_minute` acquisitions per minute, with bursts of up
+    to `capacity`. Tokens are handed out in order: a caller that finds
+    the bucket empty reserves the next one and waits for it, without
+    holding a thread.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int):
+        self.rate = rate_per_minute / 60
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns how many seconds to wait before using it.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        await asyncio.sleep(self.reserve())
+
+
+_client = None
+_client_lock = threading.Lock()
+_loop = None
+_loop_lock = threading.Lock()
+# Only used on the shared loop, so waiting callers never block a thread
+_bucket = TokenBucket(GEMINI_REQUESTS_PER_MINUTE, GEMINI_MAX_CONCURRENCY)
+_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+_counters = {
+    "calls": 0,
+    "retries": 0,
+    "errors": 0,
+    "queue_wait_seconds_total": 0.0,
+    "queue_wait_seconds_max": 0.0,
+}
+_counters_lock = threading.Lock()
+
+_call_seconds = metrics.Histogram(
+    "kredit_gemini_call_duration_seconds",
+    "Gemini API call latency, excluding rate limiter waits.",
+    ("outcome",),
+)
+
+
+def get_client():
+    """
+    Returns the process-wide client, so HTTP connections are reused
+    across invoices.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if not GEMINI_API_KEY:
+                raise Exception("GEMINI_API_KEY not configured")
+            from google import genai
+
+            http_options = None
+            if GEMINI_BASE_URL:
+                http_options = genai.types.HttpOptions(base_url=GEMINI_BASE_URL)
+            _client = genai.Client(api_key=GEMINI_API_KEY, http_options=http_options)
+        return _client
+
+
+def set_client(client):
+    """
+    Replaces the shared client, e.g. with a local fake.
+    """
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def _is_retryable(error: Exception) -> bool:
+    import httpx
+    from google.genai import errors
+
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError))
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Full jitter: uniform over [0, base * 2^attempt], capped
+    ceiling = min(GEMINI_BACKOFF_MAX_SECONDS, GEMINI_BACKOFF_BASE_SECONDS * 2**attempt)
+    return random.uniform(0, ceiling)
+
+
+def _record_wait(queued_at: float):
+    waited = time.monotonic() - queued_at
+    with _counters_lock:
+        _counters["calls"] += 1
+        _counters["queue_wait_seconds_total"] += waited
+        _counters["queue_wait_seconds_max"] = max(
+            _counters["queue_wait_seconds_max"], waited
+        )
+
+
+def _should_retry(error: Exception, attempt: int) -> bool:
+    retryable = _is_retryable(error) and attempt < GEMINI_MAX_RETRIES
+    with _counters_lock:
+        _counters["retries" if retryable else "errors"] += 1
+    if retryable:
+        print(f"Gemini call failed ({error}), retrying")
+    return retryable
+
+
+def generate_content(**kwargs):
+    """
+    Calls models.generate_content on the shared client, waiting for the
+    rate limiter and a concurrency slot, and retrying retryable errors.
+    Runs on the shared loop, so sync and async callers share one limit.
+    """
+    return run(generate_content_async(**kwargs))
+
+
+async def generate_content_async(**kwargs):
+    """
+    Same as generate_content, through the SDK's async client (client.aio).
+    Must run on the loop returned by run().
+    """
+    client = get_client()
+
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        queued_at = time.monotonic()
+        async with _slots:
+            await _bucket.acquire()
+            _record_wait(queued_at)
+            started = time.monotonic()
+            try:
+                response = await client.aio.models.generate_content(**kwargs)
+                _call_seconds.observe(time.monotonic() - started, "ok")
+                return response
+            except Exception as e:
+                _call_seconds.observe(time.monotonic() - started, "error")
+                if not _should_retry(e, attempt):
+                    raise
+
+        await asyncio.sleep(_backoff_seconds(attempt))
+
+
+def _get_loop():
+    # One long-lived loop, so the async client's connection pool is reused
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="gemini-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run(coroutine):
+    """
+    Runs a coroutine on the shared Gemini event loop and waits for it.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+
+def upload_file(file, mime_type: str):
+    """
+    Streams a file to the Files API and returns the uploaded File.
+    """
+    return get_client().files.upload(file=file, config={"mime_type": mime_type})
+
+
+def delete_file(name: str):
+    try:
+        get_client().files.delete(name=name)
+    except Exception as e:
+        print(f"Error deleting uploaded Gemini file {name}: {e}")
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+
+    counters["queue_wait_seconds_avg"] = (
+        counters["queue_wait_seconds_total"] / counters["calls"]
+        if counters["calls"]
+        else 0.0
+    )
+    return counters
+
+
+def _collect_metrics():
+    counters = stats()
+    for key, documentation in (
+        ("calls", "Gemini API calls started."),
+        ("retries", "Gemini API calls retried after a retryable error."),
+        ("errors", "Gemini API calls that failed for good."),
+        ("queue_wait_seconds_total", "Time spent waiting for the rate limiter."),
+    ):
+        name = key if key.endswith("_total") else f"{key}_total"
+        yield (f"kredit_gemini_{name}", "counter", documentation, [({}, counters[key])])
+
+
+metrics.register_collector(_collect_metrics)
@@ -1,27 +1,226 @@
+import io
 import os
 import json
 import uuid
+import asyncio
+import hashlib
+from collections import Counter
 from datetime import datetime, timezone
 from google import genai
-from models import Category, Spending, Invoice
-from database import db_session
+from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PdfReadError
+from models import Spending, Invoice
+from database import db_session, upsert
+import category_cache
+import data_version
+import extraction_cache
+import gemini_client
+import merchant_rules
+import rollups
 
-# Configure Gemini
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
+# Spendings per multi-row INSERT statement
+INSERT_BATCH_SIZE = int(os.environ.get("SPENDINGS_INSERT_BATCH_SIZE", "1000"))
 
+# PDFs with more pages than this are extracted in page chunks
+GEMINI_CHUNK_MIN_PAGES = int(os.environ.get("GEMINI_CHUNK_MIN_PAGES", "20"))
+GEMINI_CHUNK_PAGES = int(os.environ.get("GEMINI_CHUNK_PAGES", "10"))
+GEMINI_CHUNK_WORKERS = int(os.environ.get("GEMINI_CHUNK_WORKERS", "4"))
 
-def process_invoice_with_gemini(file_content: bytes, user_id: int, invoice_id: int):
+# Extra attempts for a chunk before the whole extraction fails
+GEMINI_CHUNK_RETRIES = int(os.environ.get("GEMINI_CHUNK_RETRIES", "2"))
+
+# Larger files are streamed through the Files API instead of sent inline
+GEMINI_INLINE_MAX_BYTES = int(
+    os.environ.get("GEMINI_INLINE_MAX_BYTES", str(4 * 1024 * 1024))
+)
+
+
+def assign_fingerprints(spendings):
     """
-    Processes the invoice file using Gemini API to extract spendings.
+    Sets each spending's fingerprint: a hash of its normalized name, date
+    and amount in cents, plus how many identical spendings came before it
+    in the same statement. Importing a statement again, or one that
+    overlaps it, yields the same fingerprints, while repeated purchases
+    within one statement stay distinct. The add_spendings_fingerprint
+    migration computes the same value in SQL.
+    """
+    seen = Counter()
+    for spending in spendings:
+        key = (
+            " ".join(spending["name"].lower().split()),
+            spending["date"].isoformat(),
+            round(spending["amount"] * 100),
+        )
+        raw = "|".join(map(str, (*key, seen[key])))
+        spending["fingerprint"] = hashlib.sha256(raw.encode()).hexdigest()
+        seen[key] += 1
+
+
+def _as_stream(file_content):
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        return io.BytesIO(file_content)
+    file_content.seek(0)
+    return file_content
+
+
+def _split_pdf(file_content):
+    """
+    Splits a large PDF into page ranges. Returns None when the file is
+    small enough (or not a readable PDF) to be sent whole.
+    """
+    try:
+        reader = PdfReader(_as_stream(file_content))
+        page_count = len(reader.pages)
+    except PdfReadError:
+        return None
+
+    if page_count <= GEMINI_CHUNK_MIN_PAGES:
+        return None
+
+    chunks = []
+    for first_page in range(0, page_count, GEMINI_CHUNK_PAGES):
+        last_page = min(first_page + GEMINI_CHUNK_PAGES, page_count)
+        writer = PdfWriter()
+        for page_number in range(first_page, last_page):
+            writer.add_page(reader.pages[page_number])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        chunks.append((first_page + 1, last_page, buffer.getvalue()))
+
+    return chunks
+
+
+def _extract_chunk(file_content, prompt: str):
+    """
+    Runs one extraction request. file_content is bytes or a seekable
+    binary stream; streams over GEMINI_INLINE_MAX_BYTES are uploaded
+    through the Files API so they are never read into memory whole.
+    """
+    uploaded_file = None
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        file_part = genai.types.Part.from_bytes(
+            data=bytes(file_content), mime_type="application/pdf"
+        )
+    elif file_content.seek(0, io.SEEK_END) <= GEMINI_INLINE_MAX_BYTES:
+        file_content.seek(0)
+        file_part = genai.types.Part.from_bytes(
+            data=file_content.read(), mime_type="application/pdf"
+        )
+    else:
+        file_content.seek(0)
+        uploaded_file = gemini_client.upload_file(file_content, "application/pdf")
+        file_part = genai.types.Part.from_uri(
+            file_uri=uploaded_file.uri, mime_type=uploaded_file.mime_type
+        )
+
+    try:
+        response = gemini_client.generate_content(
+            model="gemini-2.5-flash-lite",
+            contents=[
+                genai.types.Content(
+                    parts=[genai.types.Part.from_text(text=prompt), file_part]
+                )
+            ],
+        )
+    finally:
+        if uploaded_file:
+            gemini_client.delete_file(uploaded_file.name)
+
+    return _parse_response(response)
+
+
+async def _extract_chunk_async(chunk_content: bytes, prompt: str):
+    response = await gemini_client.generate_content_async(
+        model="gemini-2.5-flash-lite",
+        contents=[
+            genai.types.Content(
+                parts=[
+                    genai.types.Part.from_text(text=prompt),
+                    genai.types.Part.from_bytes(
+                        data=chunk_content, mime_type="application/pdf"
+                    ),
+                ]
+            )
+        ],
+    )
+    return _parse_response(response)
+
+
+def _parse_response(response):
+    response_text = response.text
+    if response_text:
+        response_text = response_text.strip()
+    else:
+        raise Exception("Empty response from Gemini")
+
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+
+    print(response_text)
+
+    return json.loads(response_text)
+
+
+async def _extract_chunk_with_retries(chunk, prompt: str, semaphore):
+    first_page, last_page, chunk_content = chunk
+    chunk_prompt = (
+        f"{prompt}\n    This file contains pages {first_page} to {last_page} "
+        "of the invoice. Only extract the spendings listed on these pages.\n"
+    )
+
+    for attempt in range(GEMINI_CHUNK_RETRIES + 1):
+        try:
+            async with semaphore:
+                return await _extract_chunk_async(chunk_content, chunk_prompt)
+        except Exception as e:
+            if attempt == GEMINI_CHUNK_RETRIES:
+                raise
+            print(f"Retrying pages {first_page}-{last_page} after error: {e}")
+
+
+def _merge_chunks(chunk_results):
+    """
+    Concatenates chunk results in page order. Chunks cover disjoint page
+    ranges, so identical lines in different chunks are separate charges
+    (tolls, fares) and are all kept.
+    """
+    return [item for items in chunk_results for item in items]
+
+
+def _extract_spendings(file_content, prompt: str):
     """
-    if not GEMINI_API_KEY:
-        raise Exception("GEMINI_API_KEY not configured")
+    Sends the invoice to Gemini and returns the parsed JSON list of spendings.
+    Large PDFs are extracted as concurrent page chunks.
+    """
+    chunks = _split_pdf(file_content)
+    if not chunks:
+        return _extract_chunk(file_content, prompt)
+
+    return _merge_chunks(gemini_client.run(_extract_chunks(chunks, prompt)))
 
-    client = genai.Client(api_key=GEMINI_API_KEY)
 
-    # Fetch user categories
-    user_categories = Category.query.filter_by(user_id=user_id).all()
-    category_names = [c.name for c in user_categories]
+async def _extract_chunks(chunks, prompt: str):
+    semaphore = asyncio.Semaphore(GEMINI_CHUNK_WORKERS)
+    return await asyncio.gather(
+        *(_extract_chunk_with_retries(chunk, prompt, semaphore) for chunk in chunks)
+    )
+
+
+def process_invoice_with_gemini(
+    file_content, user_id: int, invoice_id: int, file_hash: str = None
+):
+    """
+    Processes the invoice file using Gemini API to extract spendings.
+    file_content is bytes or a seekable binary stream; pass file_hash
+    when the upload was already hashed. Returns the inserted spendings,
+    how many were skipped as already imported, and how many were
+    categorized by merchant rules versus the model.
+    """
+    # User categories as a name -> id map
+    category_ids = category_cache.get_map(user_id)
+    category_names = list(category_ids)
 
     # Ensure "Other" exists in the list for the prompt
     if "Other" not in category_names:
@@ -48,72 +247,86 @@ def process_invoice_with_gemini(file_content: bytes, user_id: int, invoice_id: i
     """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=[
-                genai.types.Content(
-                    parts=[
-                        genai.types.Part.from_text(text=prompt),
-                        genai.types.Part.from_bytes(
-                            data=file_content, mime_type="application/pdf"
-                        ),
-                    ]
-                )
-            ],
-        )
+        if not file_hash:
+            file_hash = extraction_cache.content_hash(file_content)
+        categories_key = extraction_cache.categories_hash(category_names)
 
-        response_text = response.text
-        if response_text:
-            response_text = response_text.strip()
-        else:
-            raise Exception("Empty response from Gemini")
+        spendings_data = extraction_cache.get(file_hash, categories_key)
+        if spendings_data is None:
+            spendings_data = _extract_spendings(file_content, prompt)
+            extraction_cache.put(file_hash, categories_key, spendings_data)
 
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-
-        print(response_text)
+        other_category_id = category_ids.get("Other")
+        known_category_ids = set(category_ids.values())
+        import_date = datetime.now(timezone.utc)
 
-        spendings_data = json.loads(response_text)
+        # Merchants the user already re-categorized win over the model
+        rule_index = merchant_rules.get_index(user_id)
+        rule_matched = 0
 
         processed_spendings = []
-        import_date = datetime.now(timezone.utc)
-
         for item in spendings_data:
             amount = float(item["amount"])
             if amount < 0:
                 continue
 
-            category_name = item.get("category", "Other")
-            category = next(
-                (c for c in user_categories if c.name == category_name), None
+            category_id = merchant_rules.match(rule_index, item["name"])
+            if category_id in known_category_ids:
+                rule_matched += 1
+            else:
+                category_id = category_ids.get(
+                    item.get("category", "Other"), other_category_id
+                )
+
+            processed_spendings.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "name": item["name"],
+                    "date": datetime.strptime(item["date"], "%Y-%m-%d").date(),
+                    "amount": amount,
+                    "category_id": category_id,
+                    "import_date": import_date,
+                    "invoice_id": invoice_id,
+                    "user_id": user_id,
+                }
             )
 
-            category_id = category.id if category else None
-
-            if not category_id:
-                other_cat = Category.query.filter_by(
-                    user_id=user_id, name="Other"
-                ).first()
-                if other_cat:
-                    category_id = other_cat.id
-
-            spending = Spending(
-                id=str(uuid.uuid4()),
-                name=item["name"],
-                date=datetime.strptime(item["date"], "%Y-%m-%d").date(),
-                amount=amount,
-                category_id=category_id,
-                import_date=import_date,
-                invoice_id=invoice_id,
-                user_id=user_id,
+        # One multi-row INSERT per batch instead of a flush per spending.
+        # Spendings already imported hit the fingerprint index and are
+        # skipped; RETURNING tells which rows went in.
+        assign_fingerprints(processed_spendings)
+        inserted_ids = set()
+        for batch_start in range(0, len(processed_spendings), INSERT_BATCH_SIZE):
+            inserted_ids.update(
+                db_session.execute(
+                    upsert(Spending)
+                    .values(
+                        processed_spendings[
+                            batch_start : batch_start + INSERT_BATCH_SIZE
+                        ]
+                    )
+                    .on_conflict_do_nothing(
+                        index_elements=[Spending.user_id, Spending.fingerprint]
+                    )
+                    .returning(Spending.id)
+                ).scalars()
             )
-            db_session.add(spending)
-            processed_spendings.append(spending)
 
+        inserted = [
+            spending
+            for spending in processed_spendings
+            if spending["id"] in inserted_ids
+        ]
+        rollups.record_spendings(inserted)
+        if inserted:
+            data_version.bump(user_id)
         db_session.commit()
-        return processed_spendings
+        return {
+            "spendings": inserted,
+            "skipped": len(processed_spendings) - len(inserted),
+            "rule_matched": rule_matched,
+            "model_categorized": len(processed_spendings) - rule_matched,
+        }
 
     except Exception as e:
         print(f"Error processing invoice with Gemini: {e}")
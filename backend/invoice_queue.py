@@ -0,0 +1,251 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from database import db_session
+from models import (
+    InvoiceJob,
+    JOB_QUEUED,
+    JOB_PROCESSING,
+    JOB_DONE,
+    JOB_FAILED,
+)
+
+# Number of invoices extracted concurrently by this process
+INVOICE_WORKERS = int(os.environ.get("INVOICE_WORKERS", "2"))
+
+# Where uploads are kept until their job is done or has failed
+INVOICE_UPLOAD_DIR = os.environ.get(
+    "INVOICE_UPLOAD_DIR", os.path.join(os.path.dirname(__file__), "uploads")
+)
+
+# Uploads larger than this are rejected with 413
+INVOICE_MAX_UPLOAD_BYTES = int(
+    os.environ.get("INVOICE_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024))
+)
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Running jobs refresh their updated_at this often
+INVOICE_JOB_HEARTBEAT_SECONDS = int(
+    os.environ.get("INVOICE_JOB_HEARTBEAT_SECONDS", "30")
+)
+
+# Jobs untouched for longer than this are assumed to belong to a dead worker,
+# or to the backlog of a dead process, and are queued again
+INVOICE_JOB_STALE_SECONDS = int(os.environ.get("INVOICE_JOB_STALE_SECONDS", "120"))
+
+# How often each process looks for such jobs
+INVOICE_JOB_SWEEP_SECONDS = int(os.environ.get("INVOICE_JOB_SWEEP_SECONDS", "60"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=INVOICE_WORKERS, thread_name_prefix="invoice-worker"
+            )
+            _start_sweeper()
+        return _executor
+
+
+def save_upload(stream):
+    """
+    Copies an uploaded file to the upload directory in fixed-size chunks,
+    hashing it on the way. Returns (file_path, sha256 hex digest) and
+    raises ValueError if the upload is not a PDF or is too large.
+    """
+    os.makedirs(INVOICE_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(INVOICE_UPLOAD_DIR, f"{uuid.uuid4().hex}.pdf")
+    digest = hashlib.sha256()
+
+    try:
+        with open(file_path, "wb") as f:
+            first_chunk = True
+            size = 0
+            while chunk := stream.read(UPLOAD_CHUNK_SIZE):
+                if first_chunk and not chunk.startswith(b"%PDF-"):
+                    raise ValueError("Only PDF invoices are supported")
+                first_chunk = False
+                size += len(chunk)
+                if size > INVOICE_MAX_UPLOAD_BYTES:
+                    raise ValueError("File too large")
+                digest.update(chunk)
+                f.write(chunk)
+
+        if first_chunk:
+            raise ValueError("Uploaded file is empty")
+    except Exception:
+        os.remove(file_path)
+        raise
+
+    return file_path, digest.hexdigest()
+
+
+def enqueue(job_id: int):
+    """
+    Schedules a persisted job for extraction on the worker pool.
+    """
+    _get_executor().submit(_run_job, job_id)
+
+
+def recover_pending_jobs():
+    """
+    Re-enqueues jobs that were queued, or stuck processing, when the
+    previous process stopped, and keeps sweeping for stale jobs from then on.
+    """
+    _start_sweeper()
+    requeue_stale_jobs()
+
+    pending = InvoiceJob.query.filter_by(status=JOB_QUEUED).all()
+    for job in pending:
+        enqueue(job.id)
+
+    if pending:
+        print(f"Recovered {len(pending)} pending invoice jobs.")
+
+
+def requeue_stale_jobs():
+    """
+    Queues again the jobs no live worker has touched for
+    INVOICE_JOB_STALE_SECONDS: processing jobs whose worker stopped sending
+    heartbeats, and queued jobs left in a dead process's backlog. Returns
+    the ids this process re-enqueued.
+    """
+    stale_before = datetime.now(timezone.utc) - timedelta(
+        seconds=INVOICE_JOB_STALE_SECONDS
+    )
+    stale = (
+        db_session.query(InvoiceJob.id, InvoiceJob.status)
+        .filter(
+            InvoiceJob.status.in_([JOB_QUEUED, JOB_PROCESSING]),
+            InvoiceJob.updated_at < stale_before,
+        )
+        .all()
+    )
+
+    requeued = []
+    for job_id, status in stale:
+        # Conditional update so only one process (in any server) requeues it
+        claimed = InvoiceJob.query.filter(
+            InvoiceJob.id == job_id,
+            InvoiceJob.status == status,
+            InvoiceJob.updated_at < stale_before,
+        ).update(
+            {"status": JOB_QUEUED, "updated_at": datetime.now(timezone.utc)},
+            synchronize_session=False,
+        )
+        db_session.commit()
+        if claimed == 1:
+            enqueue(job_id)
+            requeued.append(job_id)
+
+    if requeued:
+        print(f"Requeued {len(requeued)} stale invoice jobs.")
+    return requeued
+
+
+def _sweep():
+    while True:
+        time.sleep(INVOICE_JOB_SWEEP_SECONDS)
+        try:
+            requeue_stale_jobs()
+        except Exception as e:
+            print(f"Error requeuing stale invoice jobs: {e}")
+            db_session.rollback()
+        finally:
+            db_session.remove()
+
+
+def _start_sweeper():
+    global _sweeper
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(
+                target=_sweep, name="invoice-sweeper", daemon=True
+            )
+            _sweeper.start()
+
+
+def _claim(job_id: int) -> bool:
+    # Conditional update so only one worker (in any process) picks the job
+    claimed = InvoiceJob.query.filter_by(id=job_id, status=JOB_QUEUED).update(
+        {"status": JOB_PROCESSING, "updated_at": datetime.now(timezone.utc)},
+        synchronize_session=False,
+    )
+    db_session.commit()
+    return claimed == 1
+
+
+def _heartbeat(job_id: int, stop: threading.Event):
+    # Tells the sweepers of every process that this job's worker is alive
+    try:
+        while not stop.wait(INVOICE_JOB_HEARTBEAT_SECONDS):
+            try:
+                InvoiceJob.query.filter_by(id=job_id, status=JOB_PROCESSING).update(
+                    {"updated_at": datetime.now(timezone.utc)},
+                    synchronize_session=False,
+                )
+                db_session.commit()
+            except Exception as e:
+                print(f"Error refreshing invoice job {job_id}: {e}")
+                db_session.rollback()
+    finally:
+        db_session.remove()
+
+
+def _finish(job_id: int, status: str, result=None, error=None):
+    job = db_session.get(InvoiceJob, job_id)
+    job.status = status
+    if result:
+        job.spendings_count = len(result["spendings"])
+        job.skipped_count = result["skipped"]
+        job.rule_matched_count = result["rule_matched"]
+        job.model_categorized_count = result["model_categorized"]
+    job.error = error
+    job.updated_at = datetime.now(timezone.utc)
+    db_session.commit()
+
+    # Nothing re-runs a finished job, failed or not, so its upload can go
+    if os.path.exists(job.file_path):
+        os.remove(job.file_path)
+
+
+def _run_job(job_id: int):
+    # Imported here so processes that never extract skip the Gemini SDK and pypdf
+    import gemini_service
+
+    stop_heartbeat = threading.Event()
+    try:
+        if not _claim(job_id):
+            return
+
+        threading.Thread(
+            target=_heartbeat, args=(job_id, stop_heartbeat), daemon=True
+        ).start()
+        job = db_session.get(InvoiceJob, job_id)
+        with open(job.file_path, "rb") as f:
+            result = gemini_service.process_invoice_with_gemini(
+                f, job.user_id, job.invoice_id, file_hash=job.content_hash
+            )
+        _finish(job_id, JOB_DONE, result=result)
+    except Exception as e:
+        print(f"Error processing invoice job {job_id}: {e}")
+        db_session.rollback()
+        try:
+            _finish(job_id, JOB_FAILED, error=str(e))
+        except Exception as finish_error:
+            print(f"Error marking invoice job {job_id} as failed: {finish_error}")
+            db_session.rollback()
+    finally:
+        stop_heartbeat.set()
+        db_session.remove()
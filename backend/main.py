@@ -2,17 +2,53 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from flask import Flask, request, jsonify
+from flask import (
+    Flask,
+    Response,
+    g,
+    request,
+    jsonify,
+    make_response,
+    stream_with_context,
+)
 from flask_cors import CORS
 from database import db_session, init_db
-from models import User, Category, Invoice, Spending
+from models import User, Category, Invoice, InvoiceJob, Spending
 import auth
+import category_cache
+import data_version
+import exports
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
-import gemini_service
-from sqlalchemy import extract
+import json
+from functools import wraps
+import time
+import base64
+from datetime import date
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+import invoice_queue
+import extraction_cache
+import gemini_client
+import merchant_rules
+import metrics
+import reports
+import rollups
+import search
+import sql_profiler
+
+# Page size limits for GET /api/spendings?limit=
+SPENDINGS_MAX_PAGE_SIZE = int(os.environ.get("SPENDINGS_MAX_PAGE_SIZE", "1000"))
+
+# Files accepted by one POST /api/invoices/batch request
+INVOICE_BATCH_MAX_FILES = int(os.environ.get("INVOICE_BATCH_MAX_FILES", "20"))
+
+# Rows fetched per round-trip when streaming spendings
+SPENDINGS_STREAM_BATCH_SIZE = int(os.environ.get("SPENDINGS_STREAM_BATCH_SIZE", "500"))
 
 app = Flask(__name__)
+# Werkzeug rejects larger request bodies with 413 before reading them
+app.config["MAX_CONTENT_LENGTH"] = invoice_queue.INVOICE_MAX_UPLOAD_BYTES
 # Enable CORS for frontend
 CORS(
     app,
@@ -26,16 +62,97 @@ def shutdown_session(exception=None):
     db_session.remove()
 
 
-# Init DB on start
 @app.before_request
-def initialize():
-    if not getattr(app, "db_initialized", False):
-        try:
-            init_db()
-            setattr(app, "db_initialized", True)
-            print("Database initialized successfully.")
-        except Exception as e:
-            print(f"Error initializing database: {e}")
+def start_timer():
+    g.request_started = time.perf_counter()
+    g.sql_profile = sql_profiler.start(f"{request.method} {request.path}")
+
+
+@app.after_request
+def record_request_stats(response):
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        # The route template, so ids in URLs do not create new series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe_request(
+            request.method, route, response.status_code, time.perf_counter() - started
+        )
+
+    profile = getattr(g, "sql_profile", None)
+    if profile is not None:
+        sql_profiler.stop()
+        response.headers.update(profile.headers())
+        profile.log(response.status_code)
+    return response
+
+
+def startup():
+    """
+    Resumes invoice jobs left by the previous process. Runs once per
+    process, from a process start hook: the ASGI lifespan, the dev server
+    below, or a WSGI server's worker hook (e.g. gunicorn's
+    `post_worker_init = lambda worker: main.startup()`), never from a
+    request. Servers without one still get their stale jobs requeued by
+    any process's sweeper, see invoice_queue.requeue_stale_jobs.
+    The schema is not checked here: production databases are migrated with
+    `uv run alembic upgrade head`, development ones with
+    `flask --app main init-db`.
+    """
+    invoice_queue.recover_pending_jobs()
+    db_session.remove()
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create missing tables."""
+    init_db()
+    print("Database initialized successfully.")
+
+
+@app.errorhandler(413)
+def request_too_large(error):
+    max_mb = invoice_queue.INVOICE_MAX_UPLOAD_BYTES // (1024 * 1024)
+    return jsonify({"message": f"File too large. Maximum size is {max_mb} MB"}), 413
+
+
+def conditional(f=None, *, extra_key=None):
+    """
+    Tags GET responses with a strong ETag derived from the user's data
+    version, and answers a matching If-None-Match with 304 before the
+    handler runs any query. extra_key() adds anything else the response
+    depends on, such as today's date.
+    """
+    if f is None:
+        return lambda f: conditional(f, extra_key=extra_key)
+
+    @wraps(f)
+    def decorated(current_user_id, *args, **kwargs):
+        if request.method != "GET":
+            return f(current_user_id, *args, **kwargs)
+
+        version = db_session.execute(
+            data_version.select_version(current_user_id)
+        ).scalar()
+        if version is None:
+            return f(current_user_id, *args, **kwargs)
+
+        request_key = f"{request.path}?{request.query_string.decode()}"
+        if extra_key:
+            request_key += f"#{extra_key()}"
+        current_etag = data_version.etag(current_user_id, version, request_key)
+        if_none_match = request.headers.get("If-None-Match")
+        if data_version.not_modified(if_none_match, current_etag):
+            response = Response(status=304)
+        else:
+            response = make_response(f(current_user_id, *args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(current_etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    return decorated
 
 
 @app.route("/health", methods=["GET"])
@@ -43,6 +160,11 @@ def health():
     return jsonify({"status": "ok"})
 
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/auth/login", methods=["POST"])
 def login():
     data = request.get_json()
@@ -67,6 +189,7 @@ def login():
             ]
             for cat_name in default_categories:
                 db_session.add(Category(name=cat_name, user_id=user.id))
+            data_version.bump(user.id, categories=True)
             db_session.commit()
 
         token = auth.generate_token(user.id)
@@ -77,6 +200,7 @@ def login():
 
 @app.route("/api/categories", methods=["GET", "POST"])
 @auth.token_required
+@conditional
 def categories(current_user_id):
     if request.method == "POST":
         data = request.get_json()
@@ -84,14 +208,18 @@ def categories(current_user_id):
         if not name:
             return jsonify({"message": "Name is required"}), 400
 
-        # Check if exists
-        existing = Category.query.filter_by(user_id=current_user_id, name=name).first()
-        if existing:
+        # Check if exists; the unique index catches concurrent creates
+        if name in category_cache.get_map(current_user_id):
             return jsonify({"message": "Category already exists"}), 400
 
         new_category = Category(name=name, user_id=current_user_id)
         db_session.add(new_category)
-        db_session.commit()
+        data_version.bump(current_user_id, categories=True)
+        try:
+            db_session.commit()
+        except IntegrityError:
+            db_session.rollback()
+            return jsonify({"message": "Category already exists"}), 400
         return jsonify(new_category.to_dict()), 201
 
     else:
@@ -99,6 +227,14 @@ def categories(current_user_id):
         return jsonify([c.to_dict() for c in user_categories])
 
 
+def category_spendings_count_statement(user_id: int, category_id: int):
+    return (
+        select(func.count())
+        .select_from(Spending)
+        .where(Spending.user_id == user_id, Spending.category_id == category_id)
+    )
+
+
 @app.route("/api/categories/<int:category_id>", methods=["DELETE"])
 @auth.token_required
 def delete_category(current_user_id, category_id):
@@ -109,22 +245,31 @@ def delete_category(current_user_id, category_id):
     if category.name == "Other":
         return jsonify({"message": "Cannot delete 'Other' category"}), 403
 
-    spendings_count = Spending.query.filter_by(category_id=category_id).count()
+    spendings_count = db_session.execute(
+        category_spendings_count_statement(current_user_id, category_id)
+    ).scalar()
     if spendings_count > 0:
-        other_cat = Category.query.filter_by(
-            user_id=current_user_id, name="Other"
-        ).first()
+        other_category_id = category_cache.get_map(current_user_id).get("Other")
 
-        if other_cat:
-            Spending.query.filter_by(category_id=category_id).update(
-                {"category_id": other_cat.id}
+        if other_category_id:
+            rollups.move_spendings(
+                current_user_id,
+                [Spending.category_id == category_id],
+                other_category_id,
+            )
+            Spending.query.filter_by(
+                user_id=current_user_id, category_id=category_id
+            ).update(
+                {"category_id": other_category_id}
             )
         else:
             return jsonify(
                 {"message": "'Other' category missing, cannot safely delete"}
             ), 500
 
+    merchant_rules.forget_category(current_user_id, category_id)
     db_session.delete(category)
+    data_version.bump(current_user_id, categories=True)
     db_session.commit()
     return jsonify({"message": "Category deleted successfully"}), 200
 
@@ -141,51 +286,362 @@ def upload_invoice(current_user_id):
         return jsonify({"message": "No selected file"}), 400
 
     if file:
-        file_content = file.read()
+        try:
+            new_invoice, new_job = _queue_invoice(file, current_user_id)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
 
-        new_invoice = Invoice(filename=file.filename, user_id=current_user_id)
+        return jsonify(
+            {
+                "message": "Invoice queued for processing",
+                "invoice": new_invoice.to_dict(),
+                "job": new_job.to_dict(),
+            }
+        ), 202
 
-        db_session.add(new_invoice)
-        db_session.commit()
 
-        try:
-            saved_invoice = new_invoice.to_dict()
+@app.route("/api/invoices/batch", methods=["POST"])
+@auth.token_required
+def upload_invoices_batch(current_user_id):
+    # The per-file limit is enforced while each file is saved
+    request.max_content_length = (
+        invoice_queue.INVOICE_MAX_UPLOAD_BYTES * INVOICE_BATCH_MAX_FILES
+    )
+    files = [file for file in request.files.getlist("files") if file.filename]
+    if not files:
+        return jsonify({"message": "No selected files"}), 400
+
+    if len(files) > INVOICE_BATCH_MAX_FILES:
+        return jsonify(
+            {"message": f"At most {INVOICE_BATCH_MAX_FILES} files per batch"}
+        ), 400
 
-            processed_spendings = gemini_service.process_invoice_with_gemini(
-                file_content, current_user_id, int(saved_invoice.get("id"))
+    # Each file gets its own invoice and job, so one bad file does not
+    # affect the others; the worker pool bounds how many run at once.
+    results = []
+    for file in files:
+        try:
+            new_invoice, new_job = _queue_invoice(file, current_user_id)
+        except Exception as e:
+            db_session.rollback()
+            results.append(
+                {"filename": file.filename, "status": "rejected", "message": str(e)}
             )
+            continue
 
-            return jsonify(
-                {
-                    "message": "Invoice processed successfully",
-                    "invoice": saved_invoice,
-                    "spendings_count": len(processed_spendings),
-                }
-            ), 201
-        except Exception as e:
-            print(f"Processing error: {e}")
-            return jsonify({"message": f"Error processing invoice: {str(e)}"}), 500
+        results.append(
+            {
+                "filename": file.filename,
+                "status": new_job.status,
+                "invoice": new_invoice.to_dict(),
+                "job": new_job.to_dict(),
+            }
+        )
+
+    return jsonify(
+        {
+            "message": "Invoices queued for processing",
+            "queued_count": sum(r["status"] != "rejected" for r in results),
+            "results": results,
+        }
+    ), 202
+
+
+def _queue_invoice(file, user_id: int):
+    """
+    Stores an uploaded file, creates its invoice and job, and enqueues the
+    job. Raises ValueError for files that are not accepted.
+    """
+    file_path, file_hash = invoice_queue.save_upload(file.stream)
+
+    new_invoice = Invoice(filename=file.filename, user_id=user_id)
+    new_job = InvoiceJob(
+        invoice=new_invoice,
+        user_id=user_id,
+        file_path=file_path,
+        content_hash=file_hash,
+    )
+
+    db_session.add(new_invoice)
+    db_session.add(new_job)
+    db_session.commit()
+
+    invoice_queue.enqueue(new_job.id)
+    return new_invoice, new_job
+
+
+@app.route("/api/invoices/<int:invoice_id>/status", methods=["GET"])
+@auth.token_required
+def get_invoice_status(current_user_id, invoice_id):
+    job = InvoiceJob.query.filter_by(
+        invoice_id=invoice_id, user_id=current_user_id
+    ).first()
+    if not job:
+        return jsonify({"message": "Invoice not found"}), 404
+
+    return jsonify(job.to_dict()), 200
+
+
+@app.route("/api/invoices/cache/stats", methods=["GET"])
+@auth.token_required
+def get_extraction_cache_stats(current_user_id):
+    return jsonify(extraction_cache.stats()), 200
+
+
+@app.route("/api/invoices/gemini/stats", methods=["GET"])
+@auth.token_required
+def get_gemini_stats(current_user_id):
+    return jsonify(gemini_client.stats()), 200
 
 
 @app.route("/api/spendings", methods=["GET"])
 @auth.token_required
+@conditional
 def get_spendings(current_user_id):
-    month = request.args.get("month")
+    try:
+        statement, limit = spendings_statement(current_user_id, request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if request.args.get("stream") in ("1", "true"):
+        return Response(
+            stream_with_context(_stream_spendings(statement)),
+            mimetype="application/json",
+        )
 
-    query = Spending.query.filter_by(user_id=current_user_id)
+    rows = db_session.execute(statement).all()
+    return jsonify(spendings_payload(rows, limit))
 
+
+def spendings_statement(user_id: int, args):
+    """
+    Builds the GET /api/spendings statement from the query string.
+    Returns (statement, limit); limit is None when the client did not ask
+    for a page. Raises ValueError with a message for the client.
+    """
+    statement = Spending.projection_select().where(Spending.user_id == user_id)
+
+    month = args.get("month")
     if month:
         try:
-            year, month_num = map(int, month.split("-"))
-            query = query.filter(
-                extract("year", Spending.date) == year,
-                extract("month", Spending.date) == month_num,
-            )
+            start, end = reports.month_range(month)
         except ValueError:
-            return jsonify({"message": "Invalid month format. Use YYYY-MM"}), 400
+            raise ValueError("Invalid month format. Use YYYY-MM")
+        statement = statement.where(Spending.date >= start, Spending.date < end)
 
-    spendings = query.order_by(Spending.date.desc()).all()
-    return jsonify([s.to_dict() for s in spendings])
+    statement = statement.order_by(Spending.date.desc(), Spending.id.desc())
+
+    limit = args.get("limit")
+    cursor = args.get("cursor")
+    if limit is None and cursor is None:
+        return statement, None
+
+    # A stream has no next_cursor to hand back, so it cannot be a page
+    if args.get("stream") in ("1", "true"):
+        raise ValueError("stream cannot be combined with limit or cursor")
+
+    try:
+        limit = int(limit or SPENDINGS_MAX_PAGE_SIZE)
+        if not 1 <= limit <= SPENDINGS_MAX_PAGE_SIZE:
+            raise ValueError(limit)
+    except ValueError:
+        raise ValueError(f"Limit must be between 1 and {SPENDINGS_MAX_PAGE_SIZE}")
+
+    if cursor:
+        try:
+            cursor_date, cursor_id = _decode_cursor(cursor)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+        statement = statement.where(
+            tuple_(Spending.date, Spending.id) < tuple_(cursor_date, cursor_id)
+        )
+
+    # One extra row tells whether another page exists
+    return statement.limit(limit + 1), limit
+
+
+def spendings_payload(rows, limit):
+    if limit is None:
+        return [Spending.row_to_dict(row) for row in rows]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1])
+
+    return {
+        "items": [Spending.row_to_dict(row) for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+def _encode_cursor(spending):
+    raw = f"{spending.date.isoformat()}|{spending.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(cursor) from e
+    cursor_date, _, cursor_id = raw.partition("|")
+    if not cursor_id:
+        raise ValueError(cursor)
+    return date.fromisoformat(cursor_date), cursor_id
+
+
+def _stream_spendings(statement):
+    # Server-side cursor keeps memory flat regardless of the result size
+    rows = db_session.execute(
+        statement.execution_options(yield_per=SPENDINGS_STREAM_BATCH_SIZE)
+    )
+    yield "["
+    for index, row in enumerate(rows):
+        yield ("," if index else "") + json.dumps(Spending.row_to_dict(row))
+    yield "]"
+
+
+def _date_range_args(args):
+    """
+    Parses the optional from/to (YYYY-MM-DD, inclusive) query arguments.
+    Raises ValueError with a message for the client.
+    """
+    try:
+        return tuple(
+            date.fromisoformat(value) if value else None
+            for value in (args.get("from"), args.get("to"))
+        )
+    except ValueError:
+        raise ValueError("Invalid date format. Use YYYY-MM-DD")
+
+
+@app.route("/api/spendings/search", methods=["GET"])
+@auth.token_required
+@conditional
+def search_spendings(current_user_id):
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"message": "Query is required"}), 400
+
+    try:
+        limit = int(request.args.get("limit", search.SEARCH_DEFAULT_LIMIT))
+        if not 1 <= limit <= search.SEARCH_MAX_LIMIT:
+            raise ValueError(limit)
+    except ValueError:
+        message = f"Limit must be between 1 and {search.SEARCH_MAX_LIMIT}"
+        return jsonify({"message": message}), 400
+
+    try:
+        start, end = _date_range_args(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    results = search.search_spendings(current_user_id, query, limit, start, end)
+    return jsonify(
+        [
+            {**Spending.row_to_dict(row), "score": round(score, 3)}
+            for row, score in results
+        ]
+    )
+
+
+@app.route("/api/spendings/export", methods=["GET"])
+@auth.token_required
+def export_spendings(current_user_id):
+    export_format = request.args.get("format", "csv")
+    if export_format not in exports.EXPORT_FORMATS:
+        return jsonify({"message": "Format must be csv or ofx"}), 400
+
+    try:
+        start, end = _date_range_args(request.args)
+        currency = exports.parse_currency(request.args.get("currency"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    statement = exports.export_select(current_user_id, start, end).execution_options(
+        yield_per=SPENDINGS_STREAM_BATCH_SIZE
+    )
+
+    if export_format == "ofx":
+        if not (start and end):
+            first, last = db_session.execute(
+                exports.select_date_range(current_user_id)
+            ).one()
+            start = start or first or date.today()
+            end = end or last or date.today()
+        body = exports.ofx_stream(db_session.execute(statement), start, end, currency)
+    else:
+        body = exports.csv_stream(db_session.execute(statement))
+
+    mimetype, extension = exports.EXPORT_FORMATS[export_format]
+    headers = {
+        "Content-Disposition": f'attachment; filename="spendings.{extension}"',
+        "Vary": "Accept-Encoding",
+    }
+    if request.args.get("gzip") in ("1", "true") or "gzip" in request.accept_encodings:
+        body = exports.gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers=headers,
+    )
+
+
+@app.route("/api/reports/summary", methods=["GET"])
+@auth.token_required
+@conditional
+def get_reports_summary(current_user_id):
+    month = request.args.get("month")
+    if not month:
+        return jsonify({"message": "Month is required. Use YYYY-MM"}), 400
+
+    try:
+        start, end = reports.month_range(month)
+    except ValueError:
+        return jsonify({"message": "Invalid month format. Use YYYY-MM"}), 400
+
+    return jsonify(reports.monthly_summary(current_user_id, start, end))
+
+
+def _trends_end_month():
+    return request.args.get("end") or date.today().strftime("%Y-%m")
+
+
+@app.route("/api/reports/trends", methods=["GET"])
+@auth.token_required
+@conditional(extra_key=_trends_end_month)
+def get_reports_trends(current_user_id):
+    # Imported here so processes that never serve trends skip NumPy
+    import trends
+
+    try:
+        months = int(request.args.get("months", "24"))
+        window = int(request.args.get("window", "3"))
+        top = int(request.args.get("top", "10"))
+    except ValueError:
+        return jsonify({"message": "months, window and top must be integers"}), 400
+    if not 1 <= months <= trends.TRENDS_MAX_MONTHS:
+        message = f"Months must be between 1 and {trends.TRENDS_MAX_MONTHS}"
+        return jsonify({"message": message}), 400
+    if not 1 <= window <= 12:
+        return jsonify({"message": "Window must be between 1 and 12"}), 400
+    if not 0 <= top <= trends.TRENDS_MAX_TOP:
+        message = f"Top must be between 0 and {trends.TRENDS_MAX_TOP}"
+        return jsonify({"message": message}), 400
+
+    try:
+        end_day = reports.month_range(_trends_end_month())[0]
+    except ValueError:
+        return jsonify({"message": "Invalid end format. Use YYYY-MM"}), 400
+
+    return jsonify(
+        trends.trends(
+            current_user_id, trends.month_number(end_day), months, window, top
+        )
+    )
 
 
 @app.route("/api/spendings/<spending_id>", methods=["PATCH"])
@@ -201,13 +657,17 @@ def update_spending(current_user_id, spending_id):
     if not spending:
         return jsonify({"message": "Spending not found"}), 404
 
-    category = Category.query.filter_by(
-        name=category_name, user_id=current_user_id
-    ).first()
-    if not category:
+    category_id = category_cache.get_map(current_user_id).get(category_name)
+    if not category_id:
         return jsonify({"message": "Category not found"}), 404
 
-    spending.category_id = category.id
+    if spending.category_id != category_id:
+        rollups.move_spendings(
+            current_user_id, [Spending.id == spending.id], category_id
+        )
+        spending.category_id = category_id
+        data_version.bump(current_user_id)
+    merchant_rules.learn(current_user_id, [spending.name], category_id)
     db_session.commit()
 
     return jsonify(spending.to_dict()), 200
@@ -226,17 +686,25 @@ def update_spendings_bulk(current_user_id):
     if not category_name:
         return jsonify({"message": "Category name is required"}), 400
 
-    category = Category.query.filter_by(
-        name=category_name, user_id=current_user_id
-    ).first()
-    if not category:
+    category_id = category_cache.get_map(current_user_id).get(category_name)
+    if not category_id:
         return jsonify({"message": "Category not found"}), 404
 
     # Bulk update
     try:
+        rollups.move_spendings(
+            current_user_id, [Spending.id.in_(spending_ids)], category_id
+        )
+        spending_names = db_session.query(Spending.name).filter(
+            Spending.id.in_(spending_ids), Spending.user_id == current_user_id
+        )
+        merchant_rules.learn(
+            current_user_id, [name for (name,) in spending_names], category_id
+        )
         updated_count = Spending.query.filter(
             Spending.id.in_(spending_ids), Spending.user_id == current_user_id
-        ).update({Spending.category_id: category.id}, synchronize_session=False)
+        ).update({Spending.category_id: category_id}, synchronize_session=False)
+        data_version.bump(current_user_id)
 
         db_session.commit()
         return jsonify(
@@ -252,4 +720,8 @@ def update_spendings_bulk(current_user_id):
 
 
 if __name__ == "__main__":
+    # The reloader re-runs this file in a child process, which is the one serving
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        init_db()
+        startup()
     app.run(debug=True, port=5001)
@@ -0,0 +1,105 @@
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime, timezone
+from models import MerchantRule
+from database import db_session, upsert
+from versioned_cache import VersionedCache
+
+# Users whose rule index is kept in memory, and how long an index is trusted
+MERCHANT_RULES_CACHE_USERS = int(os.environ.get("MERCHANT_RULES_CACHE_USERS", "1000"))
+MERCHANT_RULES_CACHE_SECONDS = int(os.environ.get("MERCHANT_RULES_CACHE_SECONDS", "300"))
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# user_id -> (time slot, {pattern: category_id})
+_indexes = VersionedCache(MERCHANT_RULES_CACHE_USERS)
+
+
+def normalize(name: str) -> str:
+    """
+    Lowercases, strips accents and punctuation, and drops tokens with
+    digits (store numbers, dates, installments), so "UBER *TRIP 4821"
+    and "Uber Trip 0093" both become "uber trip".
+    """
+    name = unicodedata.normalize("NFKD", name or "")
+    name = name.encode("ascii", "ignore").decode().lower()
+    tokens = [
+        token
+        for token in _NON_WORD.split(name)
+        if token and not any(char.isdigit() for char in token)
+    ]
+    return " ".join(tokens)
+
+
+def _load_index(user_id: int):
+    return dict(
+        db_session.query(MerchantRule.pattern, MerchantRule.category_id).filter(
+            MerchantRule.user_id == user_id
+        )
+    )
+
+
+def get_index(user_id: int):
+    """
+    Returns the user's {pattern: category_id} map, from memory when fresh.
+    """
+    # Rules learned by other processes show up once the time slot changes
+    time_slot = int(time.monotonic() // MERCHANT_RULES_CACHE_SECONDS)
+    return _indexes.get(user_id, time_slot, lambda: _load_index(user_id))
+
+
+def match(index, name: str):
+    """
+    Returns the category id of the longest rule that is a token prefix of
+    the normalized name, or None. One dict lookup per token.
+    """
+    tokens = normalize(name).split(" ")
+    for length in range(len(tokens), 0, -1):
+        category_id = index.get(" ".join(tokens[:length]))
+        if category_id is not None:
+            return category_id
+    return None
+
+
+def learn(user_id: int, names, category_id: int):
+    """
+    Records that spendings with these names belong to category_id. Runs
+    in the caller's transaction.
+    """
+    patterns = {normalize(name) for name in names} - {""}
+    if not patterns:
+        return
+
+    now = datetime.now(timezone.utc)
+    stmt = upsert(MerchantRule).values(
+        [
+            {
+                "user_id": user_id,
+                "pattern": pattern,
+                "category_id": category_id,
+                "updated_at": now,
+            }
+            for pattern in patterns
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "pattern"],
+        set_={"category_id": category_id, "updated_at": now},
+    )
+    db_session.execute(stmt)
+
+    # Reloaded on the next lookup, so a rolled back rule is never applied
+    _indexes.pop(user_id)
+
+
+def forget_category(user_id: int, category_id: int):
+    """
+    Drops the rules pointing at a category that is being deleted.
+    """
+    MerchantRule.query.filter_by(user_id=user_id, category_id=category_id).delete(
+        synchronize_session=False
+    )
+
+    _indexes.pop(user_id)
@@ -0,0 +1,132 @@
+"""
+In-process metrics rendered in the Prometheus text format by GET /metrics.
+Values are per process; Prometheus aggregates them across workers.
+"""
+
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for label_values, value in sorted(values.items()):
+            labels = _labels(dict(zip(self.label_names, label_values)))
+            yield f"{self.name}{labels} {value}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, label_names=(), buckets=LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts, sum, count]
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value: float, *label_values):
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(b), s, c) for key, (b, s, c) in self.values.items()}
+        for label_values, (bucket_counts, total, count) in sorted(values.items()):
+            label_dict = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _labels({**label_dict, "le": bound})
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels({**label_dict, "le": "+Inf"})
+            yield f"{self.name}_bucket{labels} {count}"
+            labels = _labels(label_dict)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+def register_collector(collect):
+    """
+    Registers a callable read at scrape time, for values another module
+    already tracks. collect() returns (name, type, documentation, samples)
+    tuples, where samples is a list of ({label: value}, value).
+    """
+    _collectors.append(collect)
+
+
+http_request_seconds = Histogram(
+    "kredit_http_request_duration_seconds",
+    "Time spent handling HTTP requests.",
+    ("method", "route"),
+)
+http_requests = Counter(
+    "kredit_http_requests_total",
+    "HTTP responses by route and status code.",
+    ("method", "route", "status"),
+)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float):
+    http_request_seconds.observe(seconds, method, route)
+    http_requests.inc(method, route, str(status))
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        lines.extend(metric.samples())
+
+    for collect in _collectors:
+        for name, metric_type, documentation, samples in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
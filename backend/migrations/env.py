@@ -31,6 +31,8 @@ if DB_PASSWORD:
 else:
     DATABASE_URL = f"postgresql+psycopg2://{DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+DATABASE_URL = os.environ.get("DATABASE_URL", DATABASE_URL)
+
 config.set_main_option("sqlalchemy.url", DATABASE_URL)
 
 # Interpret the config file for Python logging.
@@ -0,0 +1,36 @@
+"""Add trigram index on spendings.name
+
+Revision ID: 4e7a9c3b2d18
+Revises: b3e9d71f0a26
+Create Date: 2026-10-18 19:52:14.318207
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "4e7a9c3b2d18"
+down_revision: Union[str, Sequence[str], None] = "b3e9d71f0a26"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_spendings_name_trgm",
+        "spendings",
+        ["name"],
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The extension stays, other objects may depend on it
+    op.drop_index("ix_spendings_name_trgm", table_name="spendings")
@@ -0,0 +1,51 @@
+"""Add monthly category totals
+
+Revision ID: 5b7f0e3d9c18
+Revises: a41d2c8e6f90
+Create Date: 2026-10-18 11:26:52.640735
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "5b7f0e3d9c18"
+down_revision: Union[str, Sequence[str], None] = "a41d2c8e6f90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "monthly_category_totals",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("user_id", "month", "category_id"),
+    )
+
+    # Backfill from existing spendings
+    op.execute(
+        """
+        INSERT INTO monthly_category_totals (user_id, month, category_id, total, count)
+        SELECT user_id, date_trunc('month', date)::date, COALESCE(category_id, 0),
+               SUM(amount), COUNT(*)
+        FROM spendings
+        GROUP BY user_id, date_trunc('month', date)::date, COALESCE(category_id, 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("monthly_category_totals")
@@ -0,0 +1,70 @@
+"""Add spendings fingerprint
+
+Revision ID: 6a1f5e8c3b94
+Revises: 4e7a9c3b2d18
+Create Date: 2026-10-18 20:37:05.614829
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "6a1f5e8c3b94"
+down_revision: Union[str, Sequence[str], None] = "4e7a9c3b2d18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "spendings", sa.Column("fingerprint", sa.String(length=64), nullable=True)
+    )
+    op.add_column(
+        "invoice_jobs", sa.Column("skipped_count", sa.Integer(), nullable=True)
+    )
+    # Same value as gemini_service.assign_fingerprints. Duplicates already
+    # stored get increasing ordinals, so they are kept.
+    op.execute(
+        r"""
+        WITH normalized AS (
+            SELECT
+                id,
+                lower(regexp_replace(btrim(name), '\s+', ' ', 'g')) AS name,
+                date::text AS date,
+                round(amount * 100)::bigint::text AS cents,
+                user_id
+            FROM spendings
+        ),
+        numbered AS (
+            SELECT
+                id,
+                name || '|' || date || '|' || cents || '|' || (
+                    row_number() OVER (
+                        PARTITION BY user_id, name, date, cents ORDER BY id
+                    ) - 1
+                ) AS raw
+            FROM normalized
+        )
+        UPDATE spendings
+        SET fingerprint = encode(sha256(convert_to(numbered.raw, 'UTF8')), 'hex')
+        FROM numbered
+        WHERE spendings.id = numbered.id
+        """
+    )
+    op.create_index(
+        "ix_spendings_user_id_fingerprint",
+        "spendings",
+        ["user_id", "fingerprint"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_spendings_user_id_fingerprint", table_name="spendings")
+    op.drop_column("invoice_jobs", "skipped_count")
+    op.drop_column("spendings", "fingerprint")
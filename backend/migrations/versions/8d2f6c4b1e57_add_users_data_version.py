@@ -0,0 +1,31 @@
+"""Add users data_version
+
+Revision ID: 8d2f6c4b1e57
+Revises: f1b4d8a2e936
+Create Date: 2026-10-18 18:04:12.417305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "8d2f6c4b1e57"
+down_revision: Union[str, Sequence[str], None] = "f1b4d8a2e936"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("data_version", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "data_version")
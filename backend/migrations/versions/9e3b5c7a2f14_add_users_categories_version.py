@@ -0,0 +1,33 @@
+"""Add users categories_version
+
+Revision ID: 9e3b5c7a2f14
+Revises: 6a1f5e8c3b94
+Create Date: 2026-10-18 21:12:48.203517
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "9e3b5c7a2f14"
+down_revision: Union[str, Sequence[str], None] = "6a1f5e8c3b94"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column(
+            "categories_version", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "categories_version")
@@ -0,0 +1,38 @@
+"""Add extraction cache
+
+Revision ID: a41d2c8e6f90
+Revises: 3c5e9a1f7b42
+Create Date: 2026-10-18 10:03:17.228491
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a41d2c8e6f90"
+down_revision: Union[str, Sequence[str], None] = "3c5e9a1f7b42"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "extraction_cache",
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("categories_hash", sa.String(length=64), nullable=False),
+        sa.Column("response", sa.Text(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_used_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("content_hash", "categories_hash"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("extraction_cache")
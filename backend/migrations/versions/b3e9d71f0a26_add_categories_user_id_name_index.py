@@ -0,0 +1,44 @@
+"""Add unique categories (user_id, name) index
+
+Revision ID: b3e9d71f0a26
+Revises: 8d2f6c4b1e57
+Create Date: 2026-10-18 18:41:37.902164
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b3e9d71f0a26"
+down_revision: Union[str, Sequence[str], None] = "8d2f6c4b1e57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Older rows were never checked for duplicates; keep the first category
+    # of each name and suffix the others with their id
+    op.execute(
+        """
+        UPDATE categories
+        SET name = name || ' (' || CAST(id AS VARCHAR) || ')'
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM categories GROUP BY user_id, name
+        )
+        """
+    )
+    op.create_index(
+        "ix_categories_user_id_name",
+        "categories",
+        ["user_id", "name"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_categories_user_id_name", table_name="categories")
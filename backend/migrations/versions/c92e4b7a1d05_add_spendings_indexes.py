@@ -0,0 +1,38 @@
+"""Add spendings indexes
+
+Revision ID: c92e4b7a1d05
+Revises: 5b7f0e3d9c18
+Create Date: 2026-10-18 12:40:08.915274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c92e4b7a1d05"
+down_revision: Union[str, Sequence[str], None] = "5b7f0e3d9c18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_spendings_user_id_date",
+        "spendings",
+        ["user_id", sa.text("date DESC")],
+    )
+    op.create_index(
+        "ix_spendings_user_id_category_id",
+        "spendings",
+        ["user_id", "category_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_spendings_user_id_category_id", table_name="spendings")
+    op.drop_index("ix_spendings_user_id_date", table_name="spendings")
@@ -0,0 +1,30 @@
+"""Add content hash to invoice jobs
+
+Revision ID: e6a83f2c5d71
+Revises: c92e4b7a1d05
+Create Date: 2026-10-18 14:08:33.472960
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e6a83f2c5d71"
+down_revision: Union[str, Sequence[str], None] = "c92e4b7a1d05"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "invoice_jobs", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("invoice_jobs", "content_hash")
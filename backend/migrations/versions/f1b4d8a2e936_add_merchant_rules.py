@@ -0,0 +1,54 @@
+"""Add merchant rules
+
+Revision ID: f1b4d8a2e936
+Revises: e6a83f2c5d71
+Create Date: 2026-10-18 15:21:49.036512
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "f1b4d8a2e936"
+down_revision: Union[str, Sequence[str], None] = "e6a83f2c5d71"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "merchant_rules",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("pattern", sa.String(length=255), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["category_id"],
+            ["categories.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "pattern"),
+    )
+    op.add_column(
+        "invoice_jobs", sa.Column("rule_matched_count", sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        "invoice_jobs",
+        sa.Column("model_categorized_count", sa.Integer(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("invoice_jobs", "model_categorized_count")
+    op.drop_column("invoice_jobs", "rule_matched_count")
+    op.drop_table("merchant_rules")
@@ -1,5 +1,17 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    DateTime,
+    Float,
+    Date,
+    Text,
+    Index,
+    UniqueConstraint,
+    select,
+)
+from sqlalchemy.orm import relationship, backref
 from database import Base
 from datetime import datetime, timezone
 
@@ -9,6 +21,12 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
+    # Bumped by every write to the user's data, see data_version.py
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped only when categories are created or deleted, see category_cache.py
+    categories_version = Column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     def __repr__(self):
         return f"<User {self.username!r}>"
@@ -44,6 +62,78 @@ class Invoice(Base):
         }
 
 
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class InvoiceJob(Base):
+    __tablename__ = "invoice_jobs"
+    id = Column(Integer, primary_key=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False, unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(20), nullable=False, default=JOB_QUEUED)
+    file_path = Column(String(500), nullable=False)
+    content_hash = Column(String(64), nullable=True)
+    spendings_count = Column(Integer, nullable=True)
+    skipped_count = Column(Integer, nullable=True)
+    rule_matched_count = Column(Integer, nullable=True)
+    model_categorized_count = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    invoice = relationship("Invoice", backref=backref("job", uselist=False))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "invoice_id": self.invoice_id,
+            "status": self.status,
+            "spendings_count": self.spendings_count,
+            "skipped_count": self.skipped_count,
+            "rule_matched_count": self.rule_matched_count,
+            "model_categorized_count": self.model_categorized_count,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class ExtractionCacheEntry(Base):
+    __tablename__ = "extraction_cache"
+    content_hash = Column(String(64), primary_key=True)
+    categories_hash = Column(String(64), primary_key=True)
+    response = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    last_used_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class MonthlyCategoryTotal(Base):
+    __tablename__ = "monthly_category_totals"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    # 0 holds spendings without a category
+    category_id = Column(Integer, primary_key=True)
+    total = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class MerchantRule(Base):
+    __tablename__ = "merchant_rules"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Normalized merchant name, see merchant_rules.normalize
+    pattern = Column(String(255), nullable=False)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (UniqueConstraint("user_id", "pattern"),)
+
+
 class Spending(Base):
     __tablename__ = "spendings"
     id = Column(String(50), primary_key=True)
@@ -56,6 +146,9 @@ class Spending(Base):
     import_date = Column(DateTime, default=datetime.now(timezone.utc))
     invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Identifies the same statement line across imports, see
+    # gemini_service.assign_fingerprints
+    fingerprint = Column(String(64), nullable=True)
 
     invoice = relationship("Invoice", backref="spendings")
     category = relationship("Category", backref="spendings")
@@ -71,3 +164,48 @@ class Spending(Base):
             "import_date": self.import_date.isoformat(),
             "invoice_id": self.invoice_id,
         }
+
+    @classmethod
+    def projection_select(cls):
+        """
+        Selects only the serialized columns, with the category name joined
+        in, so listing spendings takes one query and no ORM hydration.
+        """
+        return select(
+            cls.id,
+            cls.name,
+            cls.date,
+            cls.amount,
+            Category.name.label("category_name"),
+            cls.import_date,
+            cls.invoice_id,
+        ).outerjoin(Category, cls.category_id == Category.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        return {
+            "id": row.id,
+            "name": row.name,
+            "date": row.date.isoformat(),
+            "amount": row.amount,
+            "category_name": row.category_name or "Other",
+            "import_date": row.import_date.isoformat(),
+            "invoice_id": row.invoice_id,
+        }
+
+
+Index("ix_categories_user_id_name", Category.user_id, Category.name, unique=True)
+Index("ix_spendings_user_id_date", Spending.user_id, Spending.date.desc())
+Index("ix_spendings_user_id_category_id", Spending.user_id, Spending.category_id)
+Index(
+    "ix_spendings_user_id_fingerprint",
+    Spending.user_id,
+    Spending.fingerprint,
+    unique=True,
+)
+Index(
+    "ix_spendings_name_trgm",
+    Spending.name,
+    postgresql_using="gin",
+    postgresql_ops={"name": "gin_trgm_ops"},
+).ddl_if(dialect="postgresql")
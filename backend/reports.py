@@ -0,0 +1,82 @@
+from datetime import date
+from sqlalchemy import func, select
+from models import Category, MonthlyCategoryTotal, Spending
+from database import db_session
+
+
+def month_range(month: str):
+    """
+    Parses YYYY-MM into a half-open [start, end) date range, so month
+    filters can use the (user_id, date) index. Raises ValueError.
+    """
+    year, month_num = map(int, month.split("-"))
+    start = date(year, month_num, 1)
+    if month_num == 12:
+        end = date(year + 1, 1, 1)
+    else:
+        end = date(year, month_num + 1, 1)
+    return start, end
+
+
+def summary_statements(user_id: int, start: date, end: date):
+    """
+    Returns the per-category (from the monthly rollup) and per-day
+    statements behind the monthly summary.
+    """
+    category_name = func.coalesce(Category.name, "Other")
+    category_statement = (
+        select(
+            category_name,
+            func.sum(MonthlyCategoryTotal.total),
+            func.sum(MonthlyCategoryTotal.count),
+        )
+        .outerjoin(Category, MonthlyCategoryTotal.category_id == Category.id)
+        .where(
+            MonthlyCategoryTotal.user_id == user_id,
+            MonthlyCategoryTotal.month == start,
+        )
+        .group_by(category_name)
+        .order_by(func.sum(MonthlyCategoryTotal.total).desc())
+    )
+
+    daily_statement = (
+        select(Spending.date, func.sum(Spending.amount), func.count(Spending.id))
+        .where(
+            Spending.user_id == user_id,
+            Spending.date >= start,
+            Spending.date < end,
+        )
+        .group_by(Spending.date)
+        .order_by(Spending.date)
+    )
+
+    return category_statement, daily_statement
+
+
+def build_summary(start: date, category_rows, daily_rows):
+    return {
+        "month": start.strftime("%Y-%m"),
+        "total_amount": sum(total for _, total, _ in category_rows),
+        "count": sum(count for _, _, count in category_rows),
+        "categories": [
+            {"name": name, "total": total, "count": count}
+            for name, total, count in category_rows
+        ],
+        "daily": [
+            {"date": day.isoformat(), "total": total, "count": count}
+            for day, total, count in daily_rows
+        ],
+    }
+
+
+def monthly_summary(user_id: int, start: date, end: date):
+    """
+    Aggregates a user's month of spendings per category and per day.
+    Category totals come from the monthly rollup.
+    """
+    category_statement, daily_statement = summary_statements(user_id, start, end)
+    return build_summary(
+        start,
+        db_session.execute(category_statement).all(),
+        db_session.execute(daily_statement).all(),
+    )
@@ -0,0 +1,196 @@
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import extract, func, select
+from models import MonthlyCategoryTotal, Spending
+from database import db_session, upsert
+
+# Rollup bucket for spendings without a category
+UNCATEGORIZED = 0
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def apply_deltas(deltas):
+    """
+    Adds {(user_id, month, category_id): [amount, count]} deltas to the
+    rollup. Runs in the caller's transaction, so the rollup commits
+    together with the spendings change that produced it.
+    """
+    deltas = {key: value for key, value in deltas.items() if value[1] != 0}
+    if not deltas:
+        return
+
+    stmt = upsert(MonthlyCategoryTotal).values(
+        [
+            {
+                "user_id": user_id,
+                "month": month,
+                "category_id": category_id,
+                "total": amount,
+                "count": count,
+            }
+            for (user_id, month, category_id), (amount, count) in deltas.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "month", "category_id"],
+        set_={
+            "total": MonthlyCategoryTotal.total + stmt.excluded.total,
+            "count": MonthlyCategoryTotal.count + stmt.excluded.count,
+        },
+    )
+    db_session.execute(stmt)
+
+    user_ids = {user_id for user_id, _, _ in deltas}
+    MonthlyCategoryTotal.query.filter(
+        MonthlyCategoryTotal.user_id.in_(user_ids), MonthlyCategoryTotal.count <= 0
+    ).delete(synchronize_session=False)
+
+
+def record_spendings(spendings):
+    """
+    Adds newly inserted spendings, given as column dicts.
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    for spending in spendings:
+        key = (
+            spending["user_id"],
+            month_start(spending["date"]),
+            spending["category_id"] or UNCATEGORIZED,
+        )
+        deltas[key][0] += spending["amount"]
+        deltas[key][1] += 1
+
+    apply_deltas(deltas)
+
+
+def move_spendings(user_id: int, spending_filter, new_category_id):
+    """
+    Moves the rollup of the user's spendings matching spending_filter to
+    new_category_id. Must be called before the spendings are updated.
+    """
+    # Lock the rows first (in id order, so overlapping moves cannot
+    # deadlock). A concurrent move of the same spendings waits for this
+    # transaction, then reads their new categories below.
+    db_session.execute(
+        select(Spending.id)
+        .where(Spending.user_id == user_id, *spending_filter)
+        .order_by(Spending.id)
+        .with_for_update()
+    ).all()
+
+    category_key = func.coalesce(Spending.category_id, UNCATEGORIZED)
+    year = extract("year", Spending.date)
+    month = extract("month", Spending.date)
+
+    rows = (
+        db_session.query(
+            year, month, category_key, func.sum(Spending.amount), func.count()
+        )
+        .filter(Spending.user_id == user_id, *spending_filter)
+        .group_by(year, month, category_key)
+        .all()
+    )
+
+    new_key = new_category_id or UNCATEGORIZED
+    deltas = defaultdict(lambda: [0.0, 0])
+    for row_year, row_month, category_id, amount, count in rows:
+        if category_id == new_key:
+            continue
+        month_date = date(int(row_year), int(row_month), 1)
+        deltas[(user_id, month_date, category_id)][0] -= amount
+        deltas[(user_id, month_date, category_id)][1] -= count
+        deltas[(user_id, month_date, new_key)][0] += amount
+        deltas[(user_id, month_date, new_key)][1] += count
+
+    apply_deltas(deltas)
+
+
+def _expected_totals(user_id=None):
+    category_key = func.coalesce(Spending.category_id, UNCATEGORIZED)
+    year = extract("year", Spending.date)
+    month = extract("month", Spending.date)
+
+    query = db_session.query(
+        Spending.user_id,
+        year,
+        month,
+        category_key,
+        func.sum(Spending.amount),
+        func.count(),
+    ).group_by(Spending.user_id, year, month, category_key)
+    if user_id is not None:
+        query = query.filter(Spending.user_id == user_id)
+
+    return {
+        (row_user_id, date(int(row_year), int(row_month), 1), category_id): (
+            amount,
+            count,
+        )
+        for row_user_id, row_year, row_month, category_id, amount, count in query
+    }
+
+
+def rebuild(user_id=None):
+    """
+    Recomputes the rollup from spendings, for one user or everybody.
+    """
+    query = MonthlyCategoryTotal.query
+    if user_id is not None:
+        query = query.filter(MonthlyCategoryTotal.user_id == user_id)
+    query.delete(synchronize_session=False)
+
+    expected = _expected_totals(user_id)
+    if expected:
+        db_session.execute(
+            MonthlyCategoryTotal.__table__.insert(),
+            [
+                {
+                    "user_id": row_user_id,
+                    "month": month,
+                    "category_id": category_id,
+                    "total": amount,
+                    "count": count,
+                }
+                for (row_user_id, month, category_id), (amount, count) in expected.items()
+            ],
+        )
+    db_session.commit()
+    return len(expected)
+
+
+def check(user_id=None, tolerance=0.005):
+    """
+    Compares the rollup with spendings and returns the mismatching buckets.
+    """
+    expected = _expected_totals(user_id)
+
+    query = MonthlyCategoryTotal.query
+    if user_id is not None:
+        query = query.filter(MonthlyCategoryTotal.user_id == user_id)
+    actual = {
+        (row.user_id, row.month, row.category_id): (row.total, row.count)
+        for row in query
+    }
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        expected_amount, expected_count = expected.get(key, (0.0, 0))
+        actual_amount, actual_count = actual.get(key, (0.0, 0))
+        if (
+            expected_count != actual_count
+            or abs(expected_amount - actual_amount) > tolerance
+        ):
+            mismatches.append(
+                {
+                    "user_id": key[0],
+                    "month": key[1].isoformat(),
+                    "category_id": key[2],
+                    "expected": {"total": expected_amount, "count": expected_count},
+                    "actual": {"total": actual_amount, "count": actual_count},
+                }
+            )
+
+    return mismatches
@@ -0,0 +1,99 @@
+"""
+Compares requests/sec of the sync (Flask) and async (ASGI) servers on
+the read endpoints. Starts each server in turn against the configured
+database and logs in as an existing user (see scripts/create_user.py).
+
+    uv run python scripts/bench_asgi.py --username alice --password secret \
+        --month 2025-01 --concurrency 64 --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+parser = argparse.ArgumentParser(description="Benchmark sync vs async serving.")
+parser.add_argument("--username", required=True)
+parser.add_argument("--password", required=True)
+parser.add_argument("--month", default=time.strftime("%Y-%m"))
+parser.add_argument("--concurrency", type=int, default=64)
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--port", type=int, default=5051)
+args = parser.parse_args()
+
+SERVERS = {
+    "sync": [
+        sys.executable, "-m", "flask", "--app", "main", "run",
+        "--port", str(args.port), "--with-threads",
+    ],
+    "async": [
+        sys.executable, "-m", "uvicorn", "asgi:app",
+        "--port", str(args.port), "--log-level", "warning",
+    ],
+}
+
+PATHS = [
+    f"/api/spendings?month={args.month}",
+    f"/api/reports/summary?month={args.month}",
+    "/api/categories",
+]
+
+
+def wait_until_up(base_url: str):
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/health")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+async def run_load(base_url: str, headers):
+    remaining = iter(range(args.requests))
+    failures = 0
+
+    async def worker(client):
+        nonlocal failures
+        for index in remaining:
+            response = await client.get(PATHS[index % len(PATHS)], headers=headers)
+            if response.status_code != 200:
+                failures += 1
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        # Warm up connections and caches before timing
+        await client.get(PATHS[0], headers=headers)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return args.requests / elapsed, failures
+
+
+base_url = f"http://127.0.0.1:{args.port}"
+for mode, command in SERVERS.items():
+    server = subprocess.Popen(command, cwd=os.getcwd())
+    try:
+        wait_until_up(base_url)
+        token = httpx.post(
+            f"{base_url}/auth/login",
+            json={"username": args.username, "password": args.password},
+        ).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        requests_per_second, failures = asyncio.run(run_load(base_url, headers))
+        print(
+            f"{mode:>5}: {requests_per_second:8.1f} req/s "
+            f"({args.requests} requests, {args.concurrency} concurrent, "
+            f"{failures} failed)"
+        )
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,32 @@
+"""
+Database selection shared by the benchmarks: the configured Postgres, or a
+throwaway SQLite file when Postgres is not reachable.
+"""
+
+import os
+import sys
+import tempfile
+
+
+def fall_back_to_sqlite():
+    """
+    Re-runs the calling script against a fresh SQLite file when
+    DATABASE_URL is unset and the default Postgres does not answer. Call
+    it before importing anything that imports database.py.
+    """
+    if os.environ.get("DATABASE_URL"):
+        return
+
+    from sqlalchemy.exc import OperationalError
+    from database import engine
+
+    try:
+        engine.connect().close()
+    except OperationalError:
+        sqlite_path = os.path.join(tempfile.gettempdir(), "kredit-bench.sqlite")
+        if os.path.exists(sqlite_path):
+            os.remove(sqlite_path)
+        print(f"Postgres is not reachable, falling back to {sqlite_path}")
+        os.environ["DATABASE_URL"] = f"sqlite:///{sqlite_path}"
+        # database.py reads DATABASE_URL at import time
+        os.execv(sys.executable, [sys.executable] + sys.argv)
@@ -0,0 +1,324 @@
+"""
+Seeds a synthetic dataset, drives the spendings and categories endpoints
+through the Flask test client, and records p50/p95/p99 latency and peak
+Python memory per endpoint. Uses the configured Postgres, or a throwaway
+SQLite file when Postgres is not reachable (or DATABASE_URL=sqlite:///...).
+Seeded users are removed afterwards.
+
+    uv run python scripts/bench_read_path.py --users 1000 --spendings 50000 \
+        --write-baseline
+    uv run python scripts/bench_read_path.py --users 1000 --spendings 50000 \
+        --threshold 0.2
+
+The second form exits non-zero when an endpoint's p95 latency or peak
+memory is more than --threshold above the baseline.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.append(os.getcwd())
+
+from bench_database import fall_back_to_sqlite
+
+parser = argparse.ArgumentParser(description="Benchmark the API read path.")
+parser.add_argument("--users", type=int, default=1000)
+parser.add_argument("--spendings", type=int, default=50000, help="In total")
+parser.add_argument("--categories", type=int, default=10, help="Per user")
+parser.add_argument("--months", type=int, default=24)
+parser.add_argument("--iterations", type=int, default=200, help="Per endpoint")
+parser.add_argument("--memory-iterations", type=int, default=10, help="Per endpoint")
+parser.add_argument("--baseline", default="benchmarks/read_path_baseline.json")
+parser.add_argument("--write-baseline", action="store_true")
+parser.add_argument(
+    "--threshold", type=float, default=0.2, help="Allowed regression, 0.2 = 20%%"
+)
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+fall_back_to_sqlite()
+
+from sqlalchemy import delete, insert, select
+from database import db_session, engine, init_db
+from models import (
+    User,
+    Category,
+    Invoice,
+    InvoiceJob,
+    MerchantRule,
+    MonthlyCategoryTotal,
+    Spending,
+)
+import auth
+import main
+import rollups
+
+SEED_BATCH_SIZE = 5000
+
+
+def seed():
+    """
+    Inserts users with categories, one invoice each and spendings spread
+    over the last --months months. Returns {user_id: [category ids]}.
+    """
+    random.seed(args.seed)
+    run_id = uuid.uuid4().hex[:8]
+    first_day = date.today() - timedelta(days=30 * args.months)
+    import_date = datetime.now(timezone.utc)
+
+    users = {}
+    invoices = {}
+    for user_index in range(args.users):
+        user_id = db_session.execute(
+            insert(User)
+            .values(username=f"bench-{run_id}-{user_index}", password="-")
+            .returning(User.id)
+        ).scalar_one()
+        names = [f"Category {i}" for i in range(args.categories - 1)] + ["Other"]
+        users[user_id] = list(
+            db_session.execute(
+                insert(Category)
+                .values([{"name": name, "user_id": user_id} for name in names])
+                .returning(Category.id)
+            ).scalars()
+        )
+        invoices[user_id] = db_session.execute(
+            insert(Invoice)
+            .values(filename="bench.pdf", user_id=user_id)
+            .returning(Invoice.id)
+        ).scalar_one()
+
+    user_ids = list(users)
+    for batch_start in range(0, args.spendings, SEED_BATCH_SIZE):
+        batch_end = min(batch_start + SEED_BATCH_SIZE, args.spendings)
+        batch = []
+        for index in range(batch_start, batch_end):
+            user_id = user_ids[index % len(user_ids)]
+            batch.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "name": f"Merchant {random.randint(1, 500)}",
+                    "date": first_day
+                    + timedelta(days=random.randrange(30 * args.months)),
+                    "amount": round(random.uniform(1, 500), 2),
+                    "category_id": random.choice(users[user_id]),
+                    "import_date": import_date,
+                    "invoice_id": invoices[user_id],
+                    "user_id": user_id,
+                }
+            )
+        db_session.execute(insert(Spending).values(batch))
+        rollups.record_spendings(batch)
+    db_session.commit()
+    return users
+
+
+def cleanup(user_ids):
+    for model in (
+        MonthlyCategoryTotal,
+        MerchantRule,
+        Spending,
+        InvoiceJob,
+        Invoice,
+        Category,
+        User,
+    ):
+        key = model.id if model is User else model.user_id
+        db_session.execute(delete(model).where(key.in_(user_ids)))
+    db_session.commit()
+
+
+def random_month():
+    day = date.today() - timedelta(days=random.randrange(30 * args.months))
+    return day.strftime("%Y-%m")
+
+
+def make_requests(users, client):
+    """
+    Returns {endpoint name: prepare}. prepare() does any setup that should
+    not be timed and returns a callable making the request.
+    """
+    user_ids = list(users)
+
+    def headers(user_id):
+        return {"Authorization": f"Bearer {auth.generate_token(user_id)}"}
+
+    def list_month():
+        user_id = random.choice(user_ids)
+        request_headers = headers(user_id)
+        month = random_month()
+        return lambda: client.get(
+            f"/api/spendings?month={month}", headers=request_headers
+        )
+
+    def list_page():
+        user_id = random.choice(user_ids)
+        request_headers = headers(user_id)
+        return lambda: client.get("/api/spendings?limit=100", headers=request_headers)
+
+    def list_categories():
+        request_headers = headers(random.choice(user_ids))
+        return lambda: client.get("/api/categories", headers=request_headers)
+
+    def bulk_update():
+        user_id = random.choice(user_ids)
+        request_headers = headers(user_id)
+        spending_ids = list(
+            db_session.execute(
+                select(Spending.id).where(Spending.user_id == user_id).limit(20)
+            ).scalars()
+        )
+        category_id = random.choice(users[user_id])
+        category_name = db_session.get(Category, category_id).name
+        db_session.remove()
+        body = {"spending_ids": spending_ids, "category_name": category_name}
+        return lambda: client.patch(
+            "/api/spendings", json=body, headers=request_headers
+        )
+
+    def delete_category():
+        # A fresh category holding some spendings, deleted by the request
+        user_id = random.choice(user_ids)
+        request_headers = headers(user_id)
+        category_id = db_session.execute(
+            insert(Category)
+            .values(name=f"Doomed {uuid.uuid4().hex[:8]}", user_id=user_id)
+            .returning(Category.id)
+        ).scalar_one()
+        spending_filter = [
+            Spending.id.in_(
+                select(Spending.id).where(Spending.user_id == user_id).limit(20)
+            )
+        ]
+        rollups.move_spendings(user_id, spending_filter, category_id)
+        db_session.execute(
+            Spending.__table__.update()
+            .where(Spending.user_id == user_id, *spending_filter)
+            .values(category_id=category_id)
+        )
+        db_session.commit()
+        db_session.remove()
+        return lambda: client.delete(
+            f"/api/categories/{category_id}", headers=request_headers
+        )
+
+    return {
+        "GET /api/spendings?month": list_month,
+        "GET /api/spendings?limit": list_page,
+        "GET /api/categories": list_categories,
+        "PATCH /api/spendings": bulk_update,
+        "DELETE /api/categories/<id>": delete_category,
+    }
+
+
+def measure(name, prepare):
+    latencies = []
+    for _ in range(args.iterations):
+        run = prepare()
+        started = time.perf_counter()
+        response = run()
+        latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{name}: {response.status_code} {response.get_data(as_text=True)}"
+            )
+
+    # tracemalloc slows requests down, so memory gets its own pass
+    peak_bytes = 0
+    for _ in range(args.memory_iterations):
+        run = prepare()
+        tracemalloc.start()
+        run()
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(percentiles[49] * 1000, 3),
+        "p95_ms": round(percentiles[94] * 1000, 3),
+        "p99_ms": round(percentiles[98] * 1000, 3),
+        "peak_memory_kb": round(peak_bytes / 1024, 1),
+    }
+
+
+def compare(results, baseline):
+    regressions = []
+    for name, result in results.items():
+        expected = baseline["endpoints"].get(name)
+        if not expected:
+            continue
+        for key in ("p95_ms", "peak_memory_kb"):
+            limit = expected[key] * (1 + args.threshold)
+            if result[key] > limit:
+                regressions.append(
+                    f"{name}: {key} {result[key]} > {limit:.1f} "
+                    f"(baseline {expected[key]})"
+                )
+    return regressions
+
+
+if engine.dialect.name == "sqlite":
+    init_db()
+
+config = {
+    "database": engine.dialect.name,
+    "users": args.users,
+    "spendings": args.spendings,
+    "categories": args.categories,
+    "months": args.months,
+    "iterations": args.iterations,
+    "seed": args.seed,
+}
+
+print(f"Seeding {args.users} users and {args.spendings} spendings...")
+seed_started = time.perf_counter()
+users = seed()
+db_session.remove()
+print(f"Seeded in {time.perf_counter() - seed_started:.1f}s")
+
+try:
+    client = main.app.test_client()
+    results = {}
+    for name, prepare in make_requests(users, client).items():
+        results[name] = measure(name, prepare)
+        print(
+            f"{name:<30} p50 {results[name]['p50_ms']:8.2f} ms  "
+            f"p95 {results[name]['p95_ms']:8.2f} ms  "
+            f"p99 {results[name]['p99_ms']:8.2f} ms  "
+            f"peak {results[name]['peak_memory_kb']:9.1f} KiB"
+        )
+finally:
+    db_session.remove()
+    cleanup(list(users))
+    db_session.remove()
+
+if args.write_baseline:
+    os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+    with open(args.baseline, "w") as f:
+        json.dump({"config": config, "endpoints": results}, f, indent=2)
+    print(f"Wrote baseline to {args.baseline}")
+    sys.exit(0)
+
+if not os.path.exists(args.baseline):
+    print(f"No baseline at {args.baseline}, run with --write-baseline first")
+    sys.exit(0)
+
+with open(args.baseline) as f:
+    baseline = json.load(f)
+
+if baseline["config"] != config:
+    print(f"Warning: baseline was recorded with {baseline['config']}")
+
+regressions = compare(results, baseline)
+for regression in regressions:
+    print(f"REGRESSION {regression}")
+print(f"{len(regressions)} regressions against {args.baseline}")
+sys.exit(1 if regressions else 0)
@@ -0,0 +1,88 @@
+"""
+Measures cold start: the time to import the app in a fresh interpreter,
+and the time from spawning a server to its first /health response.
+
+    uv run python scripts/bench_startup.py --runs 5
+    uv run python scripts/bench_startup.py --runs 5 --server async
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.error import URLError
+
+parser = argparse.ArgumentParser(description="Benchmark app cold start.")
+parser.add_argument("--runs", type=int, default=5)
+parser.add_argument("--port", type=int, default=5052)
+parser.add_argument("--server", choices=["sync", "async"], default="sync")
+args = parser.parse_args()
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "heavy_modules": [m for m in ("google.genai", "pypdf") if m in sys.modules],
+}))
+"""
+
+SERVERS = {
+    "sync": [sys.executable, "-m", "flask", "--app", "main", "run", "--port"],
+    "async": [sys.executable, "-m", "uvicorn", "asgi:app", "--port"],
+}
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        cwd=os.getcwd(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_health():
+    url = f"http://127.0.0.1:{args.port}/health"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        SERVERS[args.server] + [str(args.port)],
+        cwd=os.getcwd(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < 60:
+            try:
+                with urllib.request.urlopen(url) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError("Server did not answer /health within 60s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def describe(samples):
+    return (
+        f"median {statistics.median(samples) * 1000:7.1f} ms, "
+        f"min {min(samples) * 1000:7.1f} ms"
+    )
+
+
+imports = [measure_import() for _ in range(args.runs)]
+health = [measure_first_health() for _ in range(args.runs)]
+
+print(f"import main:          {describe([run['seconds'] for run in imports])}")
+print(f"first /health ({args.server}): {describe(health)}")
+heavy_modules = imports[-1]["heavy_modules"]
+print(f"heavy modules loaded at import: {', '.join(heavy_modules) or 'none'}")
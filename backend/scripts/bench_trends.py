@@ -0,0 +1,206 @@
+"""
+Compares the NumPy trends rollups against the equivalent SQL GROUP BY
+queries for one seeded user. Uses the configured Postgres, or a throwaway
+SQLite file when Postgres is not reachable (or DATABASE_URL=sqlite:///...).
+The seeded user is removed afterwards.
+
+    uv run python scripts/bench_trends.py --spendings 200000 --months 36
+
+The SQL side only aggregates monthly category totals and top merchants by
+raw name; moving averages, rolling sums and year-over-year changes would
+still have to be computed on top of it. "cold" includes loading the
+columns, "warm" reuses the cached ones.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.append(os.getcwd())
+
+from bench_database import fall_back_to_sqlite
+
+parser = argparse.ArgumentParser(description="Benchmark trends against SQL.")
+parser.add_argument("--spendings", type=int, default=200000)
+parser.add_argument("--categories", type=int, default=10)
+parser.add_argument("--merchants", type=int, default=2000)
+parser.add_argument("--months", type=int, default=36, help="Of seeded history")
+parser.add_argument("--window", type=int, default=24, help="Months in the view")
+parser.add_argument("--top", type=int, default=10)
+parser.add_argument("--iterations", type=int, default=20)
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+fall_back_to_sqlite()
+
+from sqlalchemy import delete, extract, func, insert, select
+from database import db_session, engine, init_db
+from models import User, Category, Invoice, Spending
+import trends
+
+SEED_BATCH_SIZE = 5000
+
+
+def seed():
+    """
+    Inserts one user with categories and --spendings spendings over the
+    last --months months. Returns the user id.
+    """
+    random.seed(args.seed)
+    user_id = db_session.execute(
+        insert(User)
+        .values(username=f"bench-trends-{uuid.uuid4().hex[:8]}", password="-")
+        .returning(User.id)
+    ).scalar_one()
+    names = [f"Category {i}" for i in range(args.categories - 1)] + ["Other"]
+    category_ids = list(
+        db_session.execute(
+            insert(Category)
+            .values([{"name": name, "user_id": user_id} for name in names])
+            .returning(Category.id)
+        ).scalars()
+    )
+    invoice_id = db_session.execute(
+        insert(Invoice)
+        .values(filename="bench.pdf", user_id=user_id)
+        .returning(Invoice.id)
+    ).scalar_one()
+
+    first_day = date.today() - timedelta(days=30 * args.months)
+    import_date = datetime.now(timezone.utc)
+    for batch_start in range(0, args.spendings, SEED_BATCH_SIZE):
+        batch_end = min(batch_start + SEED_BATCH_SIZE, args.spendings)
+        db_session.execute(
+            insert(Spending).values(
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "name": f"MERCHANT {random.randint(1, args.merchants)}",
+                        "date": first_day
+                        + timedelta(days=random.randrange(30 * args.months)),
+                        "amount": round(random.uniform(1, 500), 2),
+                        "category_id": random.choice(category_ids),
+                        "import_date": import_date,
+                        "invoice_id": invoice_id,
+                        "user_id": user_id,
+                    }
+                    for _ in range(batch_start, batch_end)
+                ]
+            )
+        )
+    db_session.commit()
+    return user_id
+
+
+def cleanup(user_id):
+    for model in (Spending, Invoice, Category, User):
+        key = model.id if model is User else model.user_id
+        db_session.execute(delete(model).where(key == user_id))
+    db_session.commit()
+
+
+def sql_rollups(user_id, end_month):
+    """
+    Monthly category totals over the view and its history, and the top
+    merchants of the view, straight from the spendings table.
+    """
+    first = end_month - args.window + 1
+    history_start = date((first - 12) // 12, (first - 12) % 12 + 1, 1)
+    view_start = date(first // 12, first % 12 + 1, 1)
+    view_end = date((end_month + 1) // 12, (end_month + 1) % 12 + 1, 1)
+
+    category_name = func.coalesce(Category.name, "Other")
+    year = extract("year", Spending.date)
+    month = extract("month", Spending.date)
+    monthly = db_session.execute(
+        select(category_name, year, month, func.sum(Spending.amount))
+        .outerjoin(Category, Spending.category_id == Category.id)
+        .where(
+            Spending.user_id == user_id,
+            Spending.date >= history_start,
+            Spending.date < view_end,
+        )
+        .group_by(category_name, year, month)
+    ).all()
+    merchants = db_session.execute(
+        select(Spending.name, func.sum(Spending.amount), func.count())
+        .where(
+            Spending.user_id == user_id,
+            Spending.date >= view_start,
+            Spending.date < view_end,
+        )
+        .group_by(Spending.name)
+        .order_by(func.sum(Spending.amount).desc())
+        .limit(args.top)
+    ).all()
+    return monthly, merchants
+
+
+def timed(run):
+    latencies = []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        result = run()
+        latencies.append(time.perf_counter() - started)
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return result, percentiles[49] * 1000, percentiles[94] * 1000
+
+
+def check(monthly, result):
+    """
+    Fails when a visible month's category total differs from SQL.
+    """
+    labels = set(result["months"])
+    expected = {
+        (name, f"{int(year):04d}-{int(month):02d}"): total
+        for name, year, month, total in monthly
+    }
+    for category in result["categories"]:
+        for label, total in zip(result["months"], category["totals"]):
+            sql_total = expected.pop((category["name"], label), 0.0)
+            if abs(sql_total - total) > 0.01:
+                raise SystemExit(f"{category['name']} {label}: {total} != {sql_total}")
+    leftover = [key for key, total in expected.items() if key[1] in labels and total]
+    if leftover:
+        raise SystemExit(f"Missing from trends: {leftover[:5]}")
+
+
+if engine.dialect.name == "sqlite":
+    init_db()
+
+print(f"Seeding {args.spendings} spendings...")
+user_id = seed()
+db_session.remove()
+
+try:
+    end_month = trends.month_number(date.today())
+
+    def cold():
+        trends._columns.clear()
+        return trends.trends(user_id, end_month, args.window, 3, args.top)
+
+    def warm():
+        return trends.trends(user_id, end_month, args.window, 3, args.top)
+
+    (monthly, _), sql_p50, sql_p95 = timed(lambda: sql_rollups(user_id, end_month))
+    _, cold_p50, cold_p95 = timed(cold)
+    result, warm_p50, warm_p95 = timed(warm)
+    check(monthly, result)
+
+    print(f"database: {engine.dialect.name}, spendings: {args.spendings}")
+    print(f"{'':<14} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, p50, p95 in (
+        ("sql", sql_p50, sql_p95),
+        ("numpy cold", cold_p50, cold_p95),
+        ("numpy warm", warm_p50, warm_p95),
+    ):
+        print(f"{name:<14} {p50:>10.2f} {p95:>10.2f}")
+finally:
+    db_session.remove()
+    cleanup(user_id)
+    db_session.remove()
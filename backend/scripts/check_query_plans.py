@@ -0,0 +1,119 @@
+"""
+Seeds a throwaway dataset inside a transaction, runs EXPLAIN on the
+statements GET /api/spendings?month= and DELETE /api/categories/<id>
+send, and exits non-zero when Postgres plans a sequential scan on
+spendings. Everything is rolled back.
+
+    uv run python scripts/check_query_plans.py --users 50 --spendings 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.append(os.getcwd())
+
+from sqlalchemy import text
+from database import engine
+from models import User, Category, Invoice, Spending
+import main
+
+parser = argparse.ArgumentParser(description="Check spendings query plans.")
+parser.add_argument("--users", type=int, default=50)
+parser.add_argument("--spendings", type=int, default=2000, help="Per user")
+parser.add_argument("--years", type=int, default=5)
+args = parser.parse_args()
+
+if engine.dialect.name != "postgresql":
+    sys.exit("Query plan checks need a Postgres database")
+
+users_table = User.__table__
+categories_table = Category.__table__
+invoices_table = Invoice.__table__
+spendings_table = Spending.__table__
+
+random.seed(42)
+first_day = date.today() - timedelta(days=365 * args.years)
+
+with engine.connect() as connection:
+    transaction = connection.begin()
+    try:
+        checked_user_id = None
+        checked_category_id = None
+
+        for user_index in range(args.users):
+            user_id = connection.execute(
+                users_table.insert()
+                .values(username=f"plan-check-{uuid.uuid4().hex}", password="-")
+                .returning(users_table.c.id)
+            ).scalar_one()
+            category_ids = [
+                connection.execute(
+                    categories_table.insert()
+                    .values(name=f"Category {i}", user_id=user_id)
+                    .returning(categories_table.c.id)
+                ).scalar_one()
+                for i in range(10)
+            ]
+            invoice_id = connection.execute(
+                invoices_table.insert()
+                .values(filename="plan-check.pdf", user_id=user_id)
+                .returning(invoices_table.c.id)
+            ).scalar_one()
+
+            import_date = datetime.now(timezone.utc)
+            connection.execute(
+                spendings_table.insert(),
+                [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "name": f"Merchant {random.randint(1, 500)}",
+                        "date": first_day
+                        + timedelta(days=random.randint(0, 365 * args.years)),
+                        "amount": round(random.uniform(1, 500), 2),
+                        "category_id": random.choice(category_ids),
+                        "import_date": import_date,
+                        "invoice_id": invoice_id,
+                        "user_id": user_id,
+                    }
+                    for _ in range(args.spendings)
+                ],
+            )
+
+            checked_user_id = user_id
+            checked_category_id = category_ids[0]
+
+        connection.execute(text("ANALYZE spendings"))
+
+        # The statements the endpoints send
+        month = date.today().strftime("%Y-%m")
+        queries = {
+            "GET /api/spendings?month": main.spendings_statement(
+                checked_user_id, {"month": month}
+            )[0],
+            "DELETE /api/categories/<id>": (
+                main.category_spendings_count_statement(
+                    checked_user_id, checked_category_id
+                )
+            ),
+        }
+
+        failures = 0
+        for label, query in queries.items():
+            compiled = query.compile(dialect=engine.dialect)
+            plan = "\n".join(
+                row[0]
+                for row in connection.exec_driver_sql(
+                    f"EXPLAIN {compiled}", compiled.params
+                )
+            )
+            sequential = "Seq Scan on spendings" in plan
+            failures += sequential
+            print(f"[{'FAIL' if sequential else 'OK'}] {label}\n{plan}\n")
+    finally:
+        transaction.rollback()
+
+sys.exit(1 if failures else 0)
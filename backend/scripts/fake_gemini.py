@@ -0,0 +1,147 @@
+"""
+Local stand-in for the Gemini generateContent API, for load tests that
+must not spend quota. Answers with deterministic synthetic invoice JSON
+(the same request always gets the same spendings), with optional
+latency and error injection. Only inline file parts are supported, so
+keep test invoices under GEMINI_INLINE_MAX_BYTES.
+
+    uv run python scripts/fake_gemini.py --port 8089 --spendings 200 \
+        --latency-ms 800 --jitter-ms 300 --error-rate 0.02
+
+Then start the backend with GEMINI_BASE_URL=http://127.0.0.1:8089 and
+any GEMINI_API_KEY.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+parser = argparse.ArgumentParser(description="Fake Gemini API server.")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8089)
+parser.add_argument("--spendings", type=int, default=50, help="Per response")
+parser.add_argument("--latency-ms", type=float, default=500)
+parser.add_argument("--jitter-ms", type=float, default=0)
+parser.add_argument(
+    "--error-rate", type=float, default=0, help="Share of requests answered 429/503"
+)
+args = parser.parse_args()
+
+MERCHANTS = [
+    "UBER *TRIP",
+    "IFOOD *RESTAURANTE",
+    "AMAZON MARKETPLACE",
+    "NETFLIX.COM",
+    "SPOTIFY",
+    "FARMACIA SAO JOAO",
+    "POSTO SHELL",
+    "SUPERMERCADO ZAFFARI",
+    "CINEMARK",
+    "AIRBNB",
+]
+
+_CATEGORIES = re.compile(r"using one of these categories: (.*?)\.\n")
+_PAGES = re.compile(r"pages (\d+) to (\d+)")
+
+_stats = {"requests": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def synthetic_spendings(seed: str, prompt: str):
+    categories = _CATEGORIES.search(prompt)
+    category_names = categories.group(1).split(", ") if categories else ["Other"]
+    pages = _PAGES.search(prompt)
+    page_label = f" p{pages.group(1)}" if pages else ""
+
+    rng = random.Random(seed)
+    first_day = date(2025, 1, 1)
+    return [
+        {
+            "name": f"{rng.choice(MERCHANTS)} {rng.randint(1000, 9999)}{page_label}",
+            "category": rng.choice(category_names),
+            "date": (first_day + timedelta(days=rng.randrange(28))).isoformat(),
+            "amount": round(rng.uniform(5, 500), 2),
+        }
+        for _ in range(args.spendings)
+    ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with _stats_lock:
+            _stats["requests"] += 1
+
+        if not self.path.split("?")[0].endswith(":generateContent"):
+            return self.respond(404, error(404, "NOT_FOUND", "Only generateContent"))
+
+        delay = args.latency_ms + random.uniform(-args.jitter_ms, args.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+
+        if random.random() < args.error_rate:
+            with _stats_lock:
+                _stats["errors"] += 1
+            code, status = random.choice(
+                [(429, "RESOURCE_EXHAUSTED"), (503, "UNAVAILABLE")]
+            )
+            return self.respond(code, error(code, status, "Injected error"))
+
+        request = json.loads(body)
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        spendings = synthetic_spendings(hashlib.sha256(body).hexdigest(), prompt)
+        self.respond(
+            200,
+            {
+                "candidates": [
+                    {
+                        "content": {
+                            "role": "model",
+                            "parts": [{"text": json.dumps(spendings)}],
+                        },
+                        "finishReason": "STOP",
+                        "index": 0,
+                    }
+                ],
+                "modelVersion": "fake-gemini",
+            },
+        )
+
+    def do_GET(self):
+        with _stats_lock:
+            self.respond(200, dict(_stats))
+
+    def respond(self, status: int, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *log_args):
+        pass
+
+
+def error(code: int, status: str, message: str):
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+server = ThreadingHTTPServer((args.host, args.port), Handler)
+server.daemon_threads = True
+print(f"Fake Gemini listening on http://{args.host}:{args.port}")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
@@ -0,0 +1,103 @@
+"""
+Measures end-to-end invoice ingestion throughput against a running
+backend: uploads unique PDFs through POST /api/invoices at each
+concurrency level and polls their jobs until every one finishes.
+Run the backend against scripts/fake_gemini.py to avoid spending quota.
+
+    GEMINI_BASE_URL=http://127.0.0.1:8089 GEMINI_API_KEY=fake \
+        GEMINI_REQUESTS_PER_MINUTE=100000 uv run python main.py
+    uv run python scripts/load_ingestion.py --username alice --password secret \
+        --invoices 50 --concurrency 1,4,16
+"""
+
+import argparse
+import io
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from pypdf import PdfWriter
+
+parser = argparse.ArgumentParser(description="Invoice ingestion load test.")
+parser.add_argument("--url", default="http://127.0.0.1:5001")
+parser.add_argument("--username", required=True)
+parser.add_argument("--password", required=True)
+parser.add_argument("--invoices", type=int, default=50, help="Per concurrency level")
+parser.add_argument("--concurrency", default="1,4,16", help="Comma separated")
+parser.add_argument("--pages", type=int, default=2, help="Pages per invoice")
+parser.add_argument("--poll-seconds", type=float, default=0.25)
+parser.add_argument("--timeout", type=float, default=600, help="Per level")
+args = parser.parse_args()
+
+
+def make_pdf() -> bytes:
+    # Unique metadata, so the extraction cache never short-circuits the run
+    writer = PdfWriter()
+    for _ in range(args.pages):
+        writer.add_blank_page(width=595, height=842)
+    writer.add_metadata({"/Title": uuid.uuid4().hex})
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def upload(client, headers):
+    response = client.post(
+        "/api/invoices",
+        headers=headers,
+        files={"file": (f"load-{uuid.uuid4().hex}.pdf", make_pdf(), "application/pdf")},
+    )
+    response.raise_for_status()
+    return response.json()["invoice"]["id"]
+
+
+def wait_for_jobs(client, headers, invoice_ids, deadline):
+    pending = set(invoice_ids)
+    jobs = {}
+    while pending and time.perf_counter() < deadline:
+        for invoice_id in list(pending):
+            job = client.get(
+                f"/api/invoices/{invoice_id}/status", headers=headers
+            ).json()
+            if job["status"] in ("done", "failed"):
+                jobs[invoice_id] = job
+                pending.discard(invoice_id)
+        if pending:
+            time.sleep(args.poll_seconds)
+    return jobs, pending
+
+
+def run_level(client, headers, concurrency: int):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        invoice_ids = list(
+            executor.map(lambda _: upload(client, headers), range(args.invoices))
+        )
+    uploaded = time.perf_counter()
+
+    jobs, pending = wait_for_jobs(
+        client, headers, invoice_ids, started + args.timeout
+    )
+    finished = time.perf_counter()
+
+    elapsed = finished - started
+    done = [job for job in jobs.values() if job["status"] == "done"]
+    spendings = sum(job["spendings_count"] or 0 for job in done)
+    print(
+        f"concurrency {concurrency:>3}: {len(done)}/{args.invoices} done, "
+        f"{len(jobs) - len(done)} failed, {len(pending)} timed out | "
+        f"{len(done) / elapsed * 60:8.1f} invoices/min, "
+        f"{spendings / elapsed:9.1f} spendings/s | "
+        f"uploads {uploaded - started:6.2f}s, total {elapsed:6.2f}s"
+    )
+
+
+with httpx.Client(base_url=args.url, timeout=60) as client:
+    token = client.post(
+        "/auth/login", json={"username": args.username, "password": args.password}
+    ).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for concurrency in (int(level) for level in args.concurrency.split(",")):
+        run_level(client, headers, concurrency)
@@ -0,0 +1,30 @@
+import argparse
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from database import db_session
+import rollups
+
+parser = argparse.ArgumentParser(
+    description="Rebuild or check the monthly_category_totals rollup."
+)
+parser.add_argument("--user-id", type=int, help="Only process this user")
+parser.add_argument(
+    "--check",
+    action="store_true",
+    help="Report mismatches against spendings instead of rebuilding",
+)
+args = parser.parse_args()
+
+if args.check:
+    mismatches = rollups.check(args.user_id)
+    for mismatch in mismatches:
+        print(mismatch)
+    print(f"{len(mismatches)} mismatching buckets")
+    sys.exit(1 if mismatches else 0)
+
+buckets = rollups.rebuild(args.user_id)
+db_session.remove()
+print(f"Rebuilt {buckets} rollup buckets")
@@ -0,0 +1,152 @@
+import os
+import re
+import math
+import heapq
+from array import array
+from collections import Counter, defaultdict
+from sqlalchemy import func, select
+from models import Spending
+from database import db_session, engine
+from versioned_cache import VersionedCache
+import data_version
+
+# Result limits for GET /api/spendings/search?limit=
+SEARCH_DEFAULT_LIMIT = int(os.environ.get("SEARCH_DEFAULT_LIMIT", "50"))
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", "200"))
+
+# Users whose in-process n-gram index is kept when not on Postgres
+SEARCH_INDEX_USERS = int(os.environ.get("SEARCH_INDEX_USERS", "100"))
+
+# Share of the query's trigrams a name must contain. Matches the default
+# pg_trgm.word_similarity_threshold used by the %> operator.
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+_WORDS = re.compile(r"[^\W_]+")
+
+
+def trigrams(text: str):
+    """
+    Trigrams as pg_trgm extracts them: lowercase alphanumeric words, each
+    padded with two spaces in front and one behind.
+    """
+    grams = set()
+    for word in _WORDS.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def search_spendings(user_id: int, query: str, limit: int, start=None, end=None):
+    """
+    Spendings whose name matches query, best match first, as
+    (row, score) pairs. start and end bound the date, inclusive.
+    """
+    if engine.dialect.name == "postgresql":
+        return _search_trigram_index(user_id, query, limit, start, end)
+    return _search_ngram_index(user_id, query, limit, start, end)
+
+
+def _search_trigram_index(user_id, query, limit, start, end):
+    score = func.word_similarity(query, Spending.name)
+    statement = (
+        Spending.projection_select()
+        .add_columns(score.label("score"))
+        # name %> query is word_similarity(query, name) over the threshold,
+        # answered by the ix_spendings_name_trgm GIN index
+        .where(Spending.user_id == user_id, Spending.name.op("%>")(query))
+    )
+    if start:
+        statement = statement.where(Spending.date >= start)
+    if end:
+        statement = statement.where(Spending.date <= end)
+    statement = statement.order_by(
+        score.desc(), Spending.date.desc(), Spending.id.desc()
+    ).limit(limit)
+    return [(row, row.score) for row in db_session.execute(statement)]
+
+
+class NgramIndex:
+    """
+    Trigram postings over one user's spending names, for databases
+    without pg_trgm.
+    """
+
+    def __init__(self, rows):
+        self.ids = []
+        self.dates = array("I")
+        postings = defaultdict(list)
+        for position, (spending_id, name, day) in enumerate(rows):
+            self.ids.append(spending_id)
+            self.dates.append(day.toordinal())
+            for gram in trigrams(name):
+                postings[gram].append(position)
+        self.postings = {gram: array("I", hits) for gram, hits in postings.items()}
+
+    def search(self, query_grams, limit: int, start=None, end=None):
+        """
+        Returns [(spending id, score)] for the best limit matches, newest
+        first among equal scores.
+        """
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(self.postings.get(gram, ()))
+
+        min_shared = math.ceil(WORD_SIMILARITY_THRESHOLD * len(query_grams))
+        first = start.toordinal() if start else 0
+        last = end.toordinal() if end else math.inf
+        matches = (
+            (shared, self.dates[position], self.ids[position])
+            for position, shared in counts.items()
+            if shared >= min_shared and first <= self.dates[position] <= last
+        )
+        return [
+            (spending_id, shared / len(query_grams))
+            for shared, _, spending_id in heapq.nlargest(limit, matches)
+        ]
+
+
+# user_id -> (data version, NgramIndex)
+_indexes = VersionedCache(SEARCH_INDEX_USERS)
+
+
+def get_index(user_id: int) -> NgramIndex:
+    """
+    Returns the user's n-gram index, rebuilt whenever their data version
+    has moved since it was built.
+    """
+    version = db_session.execute(data_version.select_version(user_id)).scalar()
+
+    def load():
+        return NgramIndex(
+            db_session.execute(
+                select(Spending.id, Spending.name, Spending.date)
+                .where(Spending.user_id == user_id)
+                .execution_options(yield_per=5000)
+            )
+        )
+
+    return _indexes.get(user_id, version, load)
+
+
+def _search_ngram_index(user_id, query, limit, start, end):
+    query_grams = trigrams(query)
+    if not query_grams:
+        return []
+
+    matches = get_index(user_id).search(query_grams, limit, start, end)
+    if not matches:
+        return []
+
+    rows = {
+        row.id: row
+        for row in db_session.execute(
+            Spending.projection_select().where(
+                Spending.id.in_([spending_id for spending_id, _ in matches])
+            )
+        )
+    }
+    return [
+        (rows[spending_id], score)
+        for spending_id, score in matches
+        if spending_id in rows
+    ]
@@ -0,0 +1,127 @@
+"""
+Per-request SQL profiling, enabled with SQL_PROFILER=1. Engine events
+count the statements each request runs and the time spent in them; the
+totals are returned in X-DB-Queries / X-DB-Time (ms) headers, and slow
+requests or statements repeated within one request (N+1 patterns) are
+logged. With the profiler off no event listener is installed.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SQL_PROFILER_ENABLED = os.environ.get("SQL_PROFILER", "false").lower() in ("1", "true")
+
+# Requests slower than this are logged with their slowest statements
+SQL_PROFILER_SLOW_REQUEST_MS = float(
+    os.environ.get("SQL_PROFILER_SLOW_REQUEST_MS", "500")
+)
+
+# The same statement run this many times in one request is flagged
+SQL_PROFILER_REPEAT_THRESHOLD = int(
+    os.environ.get("SQL_PROFILER_REPEAT_THRESHOLD", "3")
+)
+
+SQL_PROFILER_SLOWEST = 3
+
+_current = ContextVar("sql_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_seconds = 0.0
+        # statement -> [executions, total seconds, slowest execution]
+        self.statements = {}
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.db_seconds += seconds
+        stats = self.statements.get(statement)
+        if stats is None:
+            self.statements[statement] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def repeated(self):
+        return [
+            (statement, stats[0])
+            for statement, stats in self.statements.items()
+            if stats[0] >= SQL_PROFILER_REPEAT_THRESHOLD
+        ]
+
+    def slowest(self):
+        ranked = sorted(
+            ((stats[2], statement) for statement, stats in self.statements.items()),
+            reverse=True,
+        )
+        return ranked[:SQL_PROFILER_SLOWEST]
+
+    def headers(self):
+        return {
+            "X-DB-Queries": str(self.count),
+            "X-DB-Time": f"{self.db_seconds * 1000:.1f}",
+        }
+
+    def log(self, status: int):
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        repeated = self.repeated()
+        if elapsed_ms < SQL_PROFILER_SLOW_REQUEST_MS and not repeated:
+            return
+
+        print(
+            f"[sql-profiler] {self.label} -> {status} in {elapsed_ms:.1f} ms, "
+            f"{self.count} statements, {self.db_seconds * 1000:.1f} ms in the database"
+        )
+        for statement, count in repeated:
+            print(f"[sql-profiler]   repeated {count}x: {_shorten(statement)}")
+        if elapsed_ms >= SQL_PROFILER_SLOW_REQUEST_MS:
+            for seconds, statement in self.slowest():
+                print(
+                    f"[sql-profiler]   {seconds * 1000:.1f} ms: {_shorten(statement)}"
+                )
+
+
+def _shorten(statement: str, limit: int = 300) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def start(label: str):
+    """
+    Starts profiling the current request (thread or task) and returns its
+    RequestProfile, or None when the profiler is off.
+    """
+    if not SQL_PROFILER_ENABLED:
+        return None
+    profile = RequestProfile(label)
+    _current.set(profile)
+    return profile
+
+
+def stop():
+    _current.set(None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context.sql_profiler_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, "sql_profiler_started", None)
+    if profile is not None and started is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+if SQL_PROFILER_ENABLED:
+    # Listening on the Engine class covers the sync and the async engine
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
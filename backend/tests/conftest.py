@@ -0,0 +1,95 @@
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timezone
+
+# database.py reads DATABASE_URL at import time
+_database_dir = tempfile.mkdtemp(prefix="kredit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.sqlite')}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key-long-enough-for-hs256")
+
+import pytest
+from sqlalchemy import event, insert
+from werkzeug.security import generate_password_hash
+from database import db_session, engine, init_db
+from models import Category, Invoice, Spending, User
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+
+    init_db()
+    return main.app
+
+
+@pytest.fixture
+def client(app):
+    yield app.test_client()
+    db_session.remove()
+
+
+@pytest.fixture
+def user(client):
+    """
+    A new user, logged in once so the default categories exist. Returns
+    (user id, request headers).
+    """
+    username = f"test-{uuid.uuid4().hex[:8]}"
+    db_session.add(User(username=username, password=generate_password_hash("secret")))
+    db_session.commit()
+    db_session.remove()
+
+    response = client.post(
+        "/auth/login", json={"username": username, "password": "secret"}
+    )
+    body = response.get_json()
+    return body["user_id"], {"Authorization": f"Bearer {body['token']}"}
+
+
+def add_spendings(user_id: int, count: int, day: date = date(2024, 5, 10)):
+    """
+    Inserts count spendings for the user, spread over their categories.
+    """
+    category_ids = [
+        category_id
+        for (category_id,) in db_session.query(Category.id).filter_by(user_id=user_id)
+    ]
+    invoice_id = db_session.execute(
+        insert(Invoice)
+        .values(filename="test.pdf", user_id=user_id)
+        .returning(Invoice.id)
+    ).scalar_one()
+    db_session.execute(
+        insert(Spending),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "name": f"Merchant {index}",
+                "date": day,
+                "amount": 10.0 + index,
+                "category_id": category_ids[index % len(category_ids)],
+                "import_date": datetime.now(timezone.utc),
+                "invoice_id": invoice_id,
+                "user_id": user_id,
+            }
+            for index in range(count)
+        ],
+    )
+    db_session.commit()
+    db_session.remove()
+
+
+@pytest.fixture
+def statements():
+    """
+    SQL statements sent to the database while the test runs.
+    """
+    sent = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        sent.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield sent
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
@@ -0,0 +1,52 @@
+import asyncio
+import json
+from conftest import add_spendings
+
+
+def asgi_get(path: str, headers: dict):
+    """
+    Sends one GET straight to the ASGI app, returning (status, JSON body).
+    """
+    import asgi
+
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    status = next(m["status"] for m in messages if m["type"] == "http.response.start")
+    body = b"".join(
+        m.get("body", b"") for m in messages if m["type"] == "http.response.body"
+    )
+    return status, json.loads(body)
+
+
+def test_native_routes_match_the_flask_app(client, user):
+    user_id, headers = user
+    add_spendings(user_id, 3)
+
+    for path in ("/api/categories", "/api/spendings?month=2024-05"):
+        status, body = asgi_get(path, headers)
+        assert status == 200
+        assert body == client.get(path, headers=headers).get_json()
@@ -0,0 +1,48 @@
+import category_cache
+from conftest import add_spendings
+from database import db_session
+from models import Spending
+
+
+def category_lookups(statements):
+    # The name -> id map query; serializing the response reads one
+    # category by primary key instead
+    return [
+        statement
+        for statement in statements
+        if "FROM categories" in statement and "categories.id = " not in statement
+    ]
+
+
+def test_spending_updates_reuse_the_category_map(client, user, statements):
+    user_id, headers = user
+    add_spendings(user_id, 2)
+    spending_ids = [
+        spending_id
+        for (spending_id,) in db_session.query(Spending.id).filter_by(user_id=user_id)
+    ]
+    db_session.remove()
+    category_cache.get_map(user_id)
+    db_session.remove()
+
+    statements.clear()
+    for spending_id, category_name in zip(spending_ids, ["Travel", "Shopping"]):
+        response = client.patch(
+            f"/api/spendings/{spending_id}",
+            json={"category_name": category_name},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+    assert category_lookups(statements) == []
+
+
+def test_new_category_reloads_the_map(client, user):
+    user_id, headers = user
+    category_cache.get_map(user_id)
+    db_session.remove()
+
+    response = client.post("/api/categories", json={"name": "Pets"}, headers=headers)
+    assert response.status_code == 201
+
+    assert "Pets" in category_cache.get_map(user_id)
@@ -0,0 +1,28 @@
+from conftest import add_spendings
+
+
+def export_ofx(client, headers, query=""):
+    return client.get(
+        f"/api/spendings/export?format=ofx{query}",
+        headers={**headers, "Accept-Encoding": "identity"},
+    )
+
+
+def test_ofx_uses_the_configured_currency(client, user):
+    user_id, headers = user
+    add_spendings(user_id, 2)
+
+    body = export_ofx(client, headers).get_data(as_text=True)
+
+    assert "<CURDEF>USD</CURDEF>" in body
+    assert body.count("<STMTTRN>") == 2
+
+
+def test_ofx_currency_can_be_requested(client, user):
+    user_id, headers = user
+    add_spendings(user_id, 1)
+
+    body = export_ofx(client, headers, "&currency=brl").get_data(as_text=True)
+    assert "<CURDEF>BRL</CURDEF>" in body
+
+    assert export_ofx(client, headers, "&currency=R$").status_code == 400
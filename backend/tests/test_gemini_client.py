@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors
+import gemini_client
+
+
+class FakeModels:
+    """
+    Stands in for client.aio.models: fails with the queued errors first,
+    then answers every call.
+    """
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    async def generate_content(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures:
+                raise self.failures.pop(0)
+            return SimpleNamespace(text="[]")
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def api_error(code: int, status: str):
+    return errors.APIError(
+        code, {"error": {"code": code, "message": status, "status": status}}
+    )
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    models = FakeModels()
+    gemini_client.set_client(SimpleNamespace(aio=SimpleNamespace(models=models)))
+    monkeypatch.setattr(gemini_client, "_backoff_seconds", lambda attempt: 0)
+    monkeypatch.setattr(
+        gemini_client, "_bucket", gemini_client.TokenBucket(600000, 100)
+    )
+    yield models
+    gemini_client.set_client(None)
+
+
+def test_retries_retryable_errors(fake_models):
+    fake_models.failures = [
+        api_error(429, "RESOURCE_EXHAUSTED"),
+        api_error(503, "UNAVAILABLE"),
+    ]
+    retries = gemini_client.stats()["retries"]
+
+    response = gemini_client.generate_content(model="fake", contents=["invoice"])
+
+    assert response.text == "[]"
+    assert fake_models.calls == 3
+    assert gemini_client.stats()["retries"] == retries + 2
+
+
+def test_does_not_retry_client_errors(fake_models):
+    fake_models.failures = [api_error(400, "INVALID_ARGUMENT")]
+
+    with pytest.raises(errors.APIError):
+        gemini_client.generate_content(model="fake", contents=["invoice"])
+    assert fake_models.calls == 1
+
+
+def test_gives_up_after_max_retries(fake_models, monkeypatch):
+    monkeypatch.setattr(gemini_client, "GEMINI_MAX_RETRIES", 2)
+    fake_models.failures = [api_error(503, "UNAVAILABLE")] * 5
+    errors_before = gemini_client.stats()["errors"]
+
+    with pytest.raises(errors.APIError):
+        gemini_client.generate_content(model="fake", contents=["invoice"])
+    assert fake_models.calls == 3
+    assert gemini_client.stats()["errors"] == errors_before + 1
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(gemini_client, "GEMINI_BACKOFF_BASE_SECONDS", 1)
+    monkeypatch.setattr(gemini_client, "GEMINI_BACKOFF_MAX_SECONDS", 5)
+
+    waits = [
+        gemini_client._backoff_seconds(attempt)
+        for attempt in range(10)
+        for _ in range(20)
+    ]
+
+    assert all(0 <= wait <= 5 for wait in waits)
+    assert len(set(waits)) > 1
+    assert max(gemini_client._backoff_seconds(0) for _ in range(50)) <= 1
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    bucket = gemini_client.TokenBucket(rate_per_minute=600, capacity=2)
+
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
+
+
+def test_rate_limit_delays_calls(fake_models, monkeypatch):
+    monkeypatch.setattr(gemini_client, "_bucket", gemini_client.TokenBucket(1200, 1))
+
+    started = time.monotonic()
+    for _ in range(3):
+        gemini_client.generate_content(model="fake", contents=["invoice"])
+
+    # One token up front, then one every 50ms
+    assert time.monotonic() - started >= 0.09
+
+
+def test_concurrency_limit_without_exhausting_threads(fake_models):
+    fake_models.delay = 0.02
+
+    async def many():
+        return await asyncio.gather(
+            *(
+                gemini_client.generate_content_async(model="fake", contents=["invoice"])
+                for _ in range(64)
+            )
+        )
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        sync_calls = executor.map(
+            lambda _: gemini_client.generate_content(model="fake", contents=["x"]),
+            range(16),
+        )
+        assert len(gemini_client.run(many())) == 64
+        assert len(list(sync_calls)) == 16
+
+    assert fake_models.calls == 80
+    assert fake_models.max_in_flight <= gemini_client.GEMINI_MAX_CONCURRENCY
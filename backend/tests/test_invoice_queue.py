@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from database import db_session
+from models import Invoice, InvoiceJob, JOB_FAILED, JOB_PROCESSING, JOB_QUEUED
+import invoice_queue
+
+
+def add_job(
+    user_id: int, file_path: str, status: str = JOB_QUEUED, age_seconds: int = 0
+) -> int:
+    invoice = Invoice(filename="test.pdf", user_id=user_id)
+    db_session.add(invoice)
+    db_session.flush()
+    job = InvoiceJob(
+        invoice_id=invoice.id,
+        user_id=user_id,
+        status=status,
+        file_path=file_path,
+        updated_at=datetime.now(timezone.utc) - timedelta(seconds=age_seconds),
+    )
+    db_session.add(job)
+    db_session.commit()
+    job_id = job.id
+    db_session.remove()
+    return job_id
+
+
+def test_process_start_recovers_queued_jobs(client, user, monkeypatch, tmp_path):
+    import asgi
+
+    user_id, _ = user
+    job_id = add_job(user_id, str(tmp_path / "queued.pdf"))
+    enqueued = []
+    monkeypatch.setattr(invoice_queue, "enqueue", enqueued.append)
+
+    # Requests never run recovery
+    client.get("/health")
+    assert enqueued == []
+
+    async def serve():
+        async with asgi.lifespan(asgi.app):
+            pass
+
+    asyncio.run(serve())
+
+    assert enqueued.count(job_id) == 1
+
+
+def test_failed_job_removes_its_upload(client, user, monkeypatch, tmp_path):
+    import gemini_service
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("extraction failed")
+
+    monkeypatch.setattr(gemini_service, "process_invoice_with_gemini", fail)
+    user_id, _ = user
+    upload = tmp_path / "broken.pdf"
+    upload.write_bytes(b"%PDF-1.4")
+    job_id = add_job(user_id, str(upload))
+
+    invoice_queue._run_job(job_id)
+
+    job = db_session.get(InvoiceJob, job_id)
+    assert job.status == JOB_FAILED
+    assert job.error == "extraction failed"
+    assert not upload.exists()
+
+
+def test_sweep_requeues_jobs_without_a_live_worker(client, user, monkeypatch, tmp_path):
+    user_id, _ = user
+    stale = invoice_queue.INVOICE_JOB_STALE_SECONDS + 60
+    crashed = add_job(user_id, str(tmp_path / "a.pdf"), JOB_PROCESSING, stale)
+    orphaned = add_job(user_id, str(tmp_path / "b.pdf"), JOB_QUEUED, stale)
+    running = add_job(user_id, str(tmp_path / "c.pdf"), JOB_PROCESSING, 5)
+    enqueued = []
+    monkeypatch.setattr(invoice_queue, "enqueue", enqueued.append)
+
+    assert sorted(invoice_queue.requeue_stale_jobs()) == sorted([crashed, orphaned])
+    assert sorted(enqueued) == sorted([crashed, orphaned])
+    assert db_session.get(InvoiceJob, crashed).status == JOB_QUEUED
+    assert db_session.get(InvoiceJob, running).status == JOB_PROCESSING
+
+    # Requeued jobs are fresh again, so the next sweep leaves them alone
+    assert invoice_queue.requeue_stale_jobs() == []
@@ -0,0 +1,27 @@
+import merchant_rules
+from database import db_session
+from models import Category
+
+
+def test_rolled_back_rule_is_not_applied(client, user):
+    user_id, _ = user
+    category_id = db_session.query(Category.id).filter_by(user_id=user_id).first()[0]
+    assert merchant_rules.match(merchant_rules.get_index(user_id), "Uber Trip") is None
+
+    merchant_rules.learn(user_id, ["UBER *TRIP 4821"], category_id)
+    db_session.rollback()
+
+    index = merchant_rules.get_index(user_id)
+    assert merchant_rules.match(index, "Uber Trip 0093") is None
+
+
+def test_committed_rule_is_applied(client, user):
+    user_id, _ = user
+    category_id = db_session.query(Category.id).filter_by(user_id=user_id).first()[0]
+    merchant_rules.get_index(user_id)
+
+    merchant_rules.learn(user_id, ["UBER *TRIP 4821"], category_id)
+    db_session.commit()
+
+    index = merchant_rules.get_index(user_id)
+    assert merchant_rules.match(index, "Uber Trip 0093") == category_id
@@ -0,0 +1,40 @@
+from sqlalchemy import text
+from conftest import add_spendings
+from database import db_session, engine
+import main
+
+
+def query_plan(statement) -> str:
+    compiled = statement.compile(dialect=engine.dialect)
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}",
+            tuple(compiled.params[name] for name in compiled.positiontup),
+        )
+        return "\n".join(row[-1] for row in rows)
+
+
+def test_month_list_uses_user_date_index(client, user):
+    user_id, _ = user
+    add_spendings(user_id, 20)
+    statement, _ = main.spendings_statement(user_id, {"month": "2024-05"})
+
+    plan = query_plan(statement)
+
+    assert "USING INDEX ix_spendings_user_id_date" in plan
+    assert "SCAN spendings" not in plan
+
+
+def test_category_count_uses_user_category_index(client, user):
+    user_id, _ = user
+    add_spendings(user_id, 20)
+    category_id = db_session.execute(
+        text("SELECT category_id FROM spendings WHERE user_id = :user_id LIMIT 1"),
+        {"user_id": user_id},
+    ).scalar()
+    db_session.remove()
+
+    plan = query_plan(main.category_spendings_count_statement(user_id, category_id))
+
+    assert "ix_spendings_user_id_category_id" in plan
+    assert "SCAN spendings" not in plan
@@ -0,0 +1,34 @@
+from datetime import date
+import main
+from conftest import add_spendings
+
+
+class FakeDate(date):
+    today_value = date(2024, 5, 31)
+
+    @classmethod
+    def today(cls):
+        return cls.today_value
+
+
+def test_etag_moves_with_the_default_end_month(client, user, monkeypatch):
+    user_id, headers = user
+    add_spendings(user_id, 3)
+    monkeypatch.setattr(main, "date", FakeDate)
+
+    response = client.get("/api/reports/trends", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["months"][-1] == "2024-05"
+    etag = response.headers["ETag"]
+
+    cached = client.get(
+        "/api/reports/trends", headers={**headers, "If-None-Match": etag}
+    )
+    assert cached.status_code == 304
+
+    monkeypatch.setattr(FakeDate, "today_value", date(2024, 6, 1))
+    rolled_over = client.get(
+        "/api/reports/trends", headers={**headers, "If-None-Match": etag}
+    )
+    assert rolled_over.status_code == 200
+    assert rolled_over.get_json()["months"][-1] == "2024-06"
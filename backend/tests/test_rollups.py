@@ -0,0 +1,35 @@
+from sqlalchemy import select
+from conftest import add_spendings
+from database import db_session
+from models import Spending
+import rollups
+
+
+def test_category_moves_keep_rollup_consistent(client, user):
+    user_id, headers = user
+    add_spendings(user_id, 6)
+    rollups.rebuild(user_id)
+    db_session.commit()
+    spending_ids = list(
+        db_session.execute(
+            select(Spending.id).where(Spending.user_id == user_id)
+        ).scalars()
+    )
+    db_session.remove()
+
+    # A double-submitted PATCH, then a bulk move over the same rows
+    for _ in range(2):
+        response = client.patch(
+            f"/api/spendings/{spending_ids[0]}",
+            json={"category_name": "Travel"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+    response = client.patch(
+        "/api/spendings",
+        json={"spending_ids": spending_ids, "category_name": "Shopping"},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    assert rollups.check(user_id) == []
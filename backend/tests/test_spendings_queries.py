@@ -0,0 +1,52 @@
+import pytest
+from conftest import add_spendings
+
+
+def queries_for(client, statements, url, headers):
+    statements.clear()
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/api/spendings",
+        "/api/spendings?month=2024-05",
+        "/api/spendings?limit=50",
+        "/api/spendings?stream=1",
+    ],
+)
+def test_list_query_count_does_not_grow_with_rows(client, user, statements, url):
+    user_id, headers = user
+
+    add_spendings(user_id, 2)
+    few = queries_for(client, statements, url, headers)
+
+    add_spendings(user_id, 60)
+    many = queries_for(client, statements, url, headers)
+
+    assert many == few
+    # Data version check and the projection query
+    assert few <= 2
+
+
+def test_list_serializes_category_names_from_join(client, user):
+    user_id, headers = user
+    add_spendings(user_id, 3)
+
+    spendings = client.get("/api/spendings", headers=headers).get_json()
+
+    assert len(spendings) == 3
+    assert all(spending["category_name"] for spending in spendings)
+
+
+@pytest.mark.parametrize("query", ["stream=1&limit=1", "stream=true&cursor=abc"])
+def test_stream_rejects_pagination(client, user, query):
+    user_id, headers = user
+    add_spendings(user_id, 3)
+
+    response = client.get(f"/api/spendings?{query}", headers=headers)
+
+    assert response.status_code == 400
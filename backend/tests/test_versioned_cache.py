@@ -0,0 +1,26 @@
+from versioned_cache import VersionedCache
+
+
+def test_reloads_when_the_version_moves():
+    cache = VersionedCache(10)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get(1, 5, load) == 1
+    assert cache.get(1, 5, load) == 1
+    assert cache.get(1, 6, load) == 2
+    assert len(loads) == 2
+
+
+def test_evicts_the_least_recently_used_user():
+    cache = VersionedCache(2)
+    cache.get(1, 0, lambda: "a")
+    cache.get(2, 0, lambda: "b")
+    cache.get(1, 0, lambda: "unused")
+    cache.get(3, 0, lambda: "c")
+
+    assert cache.get(1, 0, lambda: "reloaded") == "a"
+    assert cache.get(2, 0, lambda: "reloaded") == "reloaded"
@@ -0,0 +1,205 @@
+import os
+import numpy as np
+from sqlalchemy import select
+from models import Spending
+from database import db_session
+from versioned_cache import VersionedCache
+import category_cache
+import data_version
+import merchant_rules
+
+# Limits for GET /api/reports/trends
+TRENDS_MAX_MONTHS = int(os.environ.get("TRENDS_MAX_MONTHS", "120"))
+TRENDS_MAX_TOP = int(os.environ.get("TRENDS_MAX_TOP", "50"))
+
+# Users whose spending columns are kept in memory
+TRENDS_CACHE_USERS = int(os.environ.get("TRENDS_CACHE_USERS", "100"))
+
+# Months of history before the first visible month, for rolling and
+# year-over-year values
+HISTORY_MONTHS = 12
+
+
+def month_number(day) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def month_label(number: int) -> str:
+    return f"{number // 12:04d}-{number % 12 + 1:02d}"
+
+
+class SpendingColumns:
+    """
+    One user's spendings as parallel arrays: month number, amount,
+    category index and merchant index. Category and merchant indexes point
+    into category_names and merchant_names; spendings without a category
+    count as "Other", merchants are grouped by merchant_rules.normalize.
+    """
+
+    def __init__(self, rows, category_ids):
+        self.category_names = sorted(set(category_ids) | {"Other"})
+        position = {name: i for i, name in enumerate(self.category_names)}
+        category_index = {
+            category_id: position[name] for name, category_id in category_ids.items()
+        }
+        other = position["Other"]
+
+        merchant_index = {}
+        names = {}
+
+        def merchant(name):
+            code = names.get(name)
+            if code is None:
+                key = merchant_rules.normalize(name) or name
+                code = merchant_index.setdefault(key, len(merchant_index))
+                names[name] = code
+            return code
+
+        count = len(rows)
+        self.months = np.fromiter(
+            (month_number(row.date) for row in rows), np.int32, count
+        )
+        self.amounts = np.fromiter((row.amount for row in rows), np.float64, count)
+        self.categories = np.fromiter(
+            (category_index.get(row.category_id, other) for row in rows),
+            np.int32,
+            count,
+        )
+        self.merchants = np.fromiter(
+            (merchant(row.name) for row in rows), np.int32, count
+        )
+        self.merchant_names = list(merchant_index)
+
+        # Shared between request threads
+        for column in (self.months, self.amounts, self.categories, self.merchants):
+            column.flags.writeable = False
+
+
+# user_id -> (data version, SpendingColumns)
+_columns = VersionedCache(TRENDS_CACHE_USERS)
+
+
+def get_columns(user_id: int) -> SpendingColumns:
+    """
+    Returns the user's spending columns, reloaded whenever their data
+    version has moved since they were loaded.
+    """
+    version = db_session.execute(data_version.select_version(user_id)).scalar()
+
+    def load():
+        rows = db_session.execute(
+            select(
+                Spending.date, Spending.amount, Spending.category_id, Spending.name
+            ).where(Spending.user_id == user_id)
+        ).all()
+        return SpendingColumns(rows, category_cache.get_map(user_id))
+
+    return _columns.get(user_id, version, load)
+
+
+def _rounded(values):
+    return np.round(values, 2).tolist()
+
+
+def _series(totals, cumulative, window: int, months: int):
+    """
+    Visible-month series for one row of totals spanning HISTORY_MONTHS
+    extra months, with its cumulative sum (leading zero included).
+    """
+    # cumulative[i] is the sum of the first i months
+    end = HISTORY_MONTHS + 1
+    start = end - HISTORY_MONTHS
+    previous = totals[:months]
+    current = totals[HISTORY_MONTHS:]
+    year_over_year = np.divide(
+        current - previous,
+        previous,
+        out=np.full(months, np.nan),
+        where=previous > 0,
+    )
+    return {
+        "totals": _rounded(current),
+        "moving_average": _rounded(
+            (cumulative[end:] - cumulative[end - window : end - window + months])
+            / window
+        ),
+        "rolling_12": _rounded(
+            cumulative[end:] - cumulative[start : start + months]
+        ),
+        "year_over_year": [
+            None if np.isnan(change) else round(float(change), 4)
+            for change in year_over_year
+        ],
+    }
+
+
+def compute_trends(
+    columns: SpendingColumns, end_month: int, months: int, window: int, top: int
+):
+    """
+    Monthly totals per category for the months months ending at end_month
+    (a month_number), with a window-month moving average, rolling 12-month
+    sums and year-over-year change, plus the top merchants of the period.
+    """
+    first = end_month - months + 1
+    history_first = first - HISTORY_MONTHS
+    span = months + HISTORY_MONTHS
+    category_count = len(columns.category_names)
+
+    in_span = (columns.months >= history_first) & (columns.months <= end_month)
+    offsets = columns.months[in_span] - history_first
+    totals = np.bincount(
+        columns.categories[in_span] * span + offsets,
+        weights=columns.amounts[in_span],
+        minlength=category_count * span,
+    ).reshape(category_count, span)
+
+    cumulative = np.zeros((category_count, span + 1))
+    np.cumsum(totals, axis=1, out=cumulative[:, 1:])
+    overall = totals.sum(axis=0)
+    overall_cumulative = np.concatenate(([0.0], np.cumsum(overall)))
+
+    visible_totals = totals[:, HISTORY_MONTHS:].sum(axis=1)
+    categories = [
+        {
+            "name": columns.category_names[index],
+            "total": round(float(visible_totals[index]), 2),
+            **_series(totals[index], cumulative[index], window, months),
+        }
+        for index in np.argsort(-visible_totals, kind="stable")
+        if totals[index].any()
+    ]
+
+    visible = (columns.months >= first) & (columns.months <= end_month)
+    merchant_codes = columns.merchants[visible]
+    merchant_totals = np.bincount(
+        merchant_codes,
+        weights=columns.amounts[visible],
+        minlength=len(columns.merchant_names),
+    )
+    merchant_counts = np.bincount(
+        merchant_codes, minlength=len(columns.merchant_names)
+    )
+    top = min(top, len(merchant_totals))
+    leaders = np.argpartition(-merchant_totals, top - 1)[:top] if top else []
+    leaders = sorted(leaders, key=lambda code: -merchant_totals[code])
+
+    return {
+        "months": [month_label(number) for number in range(first, end_month + 1)],
+        "window": window,
+        "total": _series(overall, overall_cumulative, window, months),
+        "categories": categories,
+        "top_merchants": [
+            {
+                "name": columns.merchant_names[code],
+                "total": round(float(merchant_totals[code]), 2),
+                "count": int(merchant_counts[code]),
+            }
+            for code in leaders
+            if merchant_counts[code]
+        ],
+    }
+
+
+def trends(user_id: int, end_month: int, months: int, window: int, top: int):
+    return compute_trends(get_columns(user_id), end_month, months, window, top)
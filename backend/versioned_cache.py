@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """
+    Per-user values kept in memory together with the version they were
+    built from, evicting the least recently used user past max_users.
+    Shared between request threads; values are loaded outside the lock.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        # user_id -> (version, value)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, version, load):
+        """
+        Returns the user's value if it was built from version, otherwise
+        calls load() and keeps its result for version.
+        """
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached and cached[0] == version:
+                self._entries.move_to_end(user_id)
+                return cached[1]
+
+        value = load()
+
+        with self._lock:
+            self._entries[user_id] = (version, value)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return value
+
+    def pop(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
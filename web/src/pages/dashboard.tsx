@@ -18,15 +18,17 @@ import {
 
 import { api } from "@/api";
 
-interface Spending {
-  id: string;
-  amount: number;
-  date: string;
-  category_name: string;
+interface Summary {
+  total_amount: number;
+  count: number;
+  categories: { name: string; total: number; count: number }[];
+  daily: { date: string; total: number; count: number }[];
 }
 
+const EMPTY_SUMMARY: Summary = { total_amount: 0, count: 0, categories: [], daily: [] };
+
 export default function Dashboard() {
-  const [spendings, setSpendings] = useState<Spending[]>([]);
+  const [summary, setSummary] = useState<Summary>(EMPTY_SUMMARY);
   const [loading, setLoading] = useState(true);
   const [selectedMonth, setSelectedMonth] = useState(format(new Date(), "yyyy-MM"));
 
@@ -37,43 +39,24 @@ export default function Dashboard() {
   const fetchData = async () => {
     setLoading(true);
     try {
-      const res = await api.get(`/api/spendings?month=${selectedMonth}`);
-      setSpendings(res.data);
+      const res = await api.get(`/api/reports/summary?month=${selectedMonth}`);
+      setSummary(res.data);
     } catch (error) {
-      console.error("Error fetching spendings:", error);
+      console.error("Error fetching summary:", error);
     } finally {
       setLoading(false);
     }
   };
 
-  // Group by category
-  const categoryData = spendings
-    .reduce((acc, curr) => {
-      const existing = acc.find((item) => item.name === curr.category_name);
-      if (existing) {
-        existing.value += curr.amount;
-      } else {
-        acc.push({ name: curr.category_name, value: curr.amount });
-      }
-      return acc;
-    }, [] as { name: string; value: number }[])
-    .sort((a, b) => b.value - a.value);
+  const categoryData = summary.categories.map((c) => ({ name: c.name, value: c.total }));
 
-  // Group by day of month
-  const dailyData = spendings
-    .reduce((acc, curr) => {
-      const day = format(parseISO(curr.date), "d");
-      const existing = acc.find((item) => item.day === day);
-      if (existing) {
-        existing.amount += curr.amount;
-      } else {
-        acc.push({ day, amount: curr.amount, date: curr.date });
-      }
-      return acc;
-    }, [] as { day: string; amount: number; date: string }[])
-    .sort((a, b) => new Date(a.date).getTime() - new Date(b.date).getTime());
+  const dailyData = summary.daily.map((d) => ({
+    day: format(parseISO(d.date), "d"),
+    amount: d.total,
+    date: d.date,
+  }));
 
-  const totalAmount = spendings.reduce((sum, s) => sum + s.amount, 0);
+  const totalAmount = summary.total_amount;
   const COLORS = ["#4F46E5", "#10B981", "#F59E0B", "#EF4444", "#8B5CF6", "#EC4899", "#6366F1", "#14B8A6"];
 
   return (
@@ -102,7 +85,7 @@ export default function Dashboard() {
         </div>
         <div className="bg-white p-6 rounded-lg shadow-sm border-l-4 border-amber-500">
           <p className="text-sm font-medium text-gray-500">Transactions</p>
-          <p className="text-3xl font-bold text-gray-900 mt-2">{spendings.length}</p>
+          <p className="text-3xl font-bold text-gray-900 mt-2">{summary.count}</p>
         </div>
       </div>
 
@@ -2,35 +2,72 @@ import { type SubmitEvent, useState } from "react";
 
 import { api } from "@/api";
 
+interface InvoiceJob {
+  id: number;
+  invoice_id: number;
+  status: "queued" | "processing" | "done" | "failed";
+  spendings_count: number | null;
+  error: string | null;
+}
+
+const POLL_INTERVAL_MS = 2000;
+
+const waitForJob = async (invoiceId: number): Promise<InvoiceJob> => {
+  for (;;) {
+    const res = await api.get<InvoiceJob>(`/api/invoices/${invoiceId}/status`);
+    if (res.data.status === "done" || res.data.status === "failed") {
+      return res.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+  }
+};
+
 export default function ImportPage() {
-  const [file, setFile] = useState<File | null>(null);
+  const [files, setFiles] = useState<File[]>([]);
   const [uploading, setUploading] = useState(false);
   const [message, setMessage] = useState("");
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     if (e.target.files) {
-      setFile(e.target.files[0]);
+      setFiles(Array.from(e.target.files));
     }
   };
 
   const handleUpload = async (e: SubmitEvent) => {
     e.preventDefault();
-    if (!file) return;
+    if (files.length === 0) return;
 
     setUploading(true);
     setMessage("");
 
     const formData = new FormData();
-    formData.append("file", file);
+    files.forEach((file) => formData.append("files", file));
 
     try {
-      await api.post("/api/invoices", formData, {
+      const res = await api.post("/api/invoices/batch", formData, {
         headers: {
           "Content-Type": "multipart/form-data",
         },
       });
-      setMessage("Invoice uploaded successfully!");
-      setFile(null);
+      setMessage(`${res.data.queued_count} invoice(s) uploaded, processing...`);
+
+      const results: { filename: string; status: string; message?: string; invoice?: { id: number } }[] =
+        res.data.results;
+      const outcomes = await Promise.all(
+        results.map(async (result) => {
+          if (!result.invoice) return `${result.filename}: ${result.message}`;
+          const job = await waitForJob(result.invoice.id);
+          return job.status === "done" ? null : `${result.filename}: ${job.error}`;
+        }),
+      );
+
+      const failures = outcomes.filter((outcome) => outcome !== null);
+      if (failures.length === 0) {
+        setMessage(`${results.length} invoice(s) processed successfully!`);
+        setFiles([]);
+      } else {
+        setMessage(`Failed to process ${failures.length} of ${results.length} invoice(s). ${failures.join("; ")}`);
+      }
     } catch (error) {
       console.error("Error uploading invoice:", error);
       setMessage("Failed to upload invoice.");
@@ -51,17 +88,20 @@ export default function ImportPage() {
               onChange={handleFileChange}
               className="hidden"
               id="file-upload"
-              accept=".csv,.pdf,.txt"
+              accept=".pdf"
+              multiple
             />
             <label htmlFor="file-upload" className="cursor-pointer flex flex-col items-center justify-center">
-              <div className="text-gray-600 mb-2">{file ? file.name : "Click to select a file or drag and drop"}</div>
-              <span className="text-sm text-gray-500">CSV, PDF, or Text files</span>
+              <div className="text-gray-600 mb-2">{files.length > 0
+                  ? files.map((file) => file.name).join(", ")
+                  : "Click to select files or drag and drop"}</div>
+              <span className="text-sm text-gray-500">PDF files</span>
             </label>
           </div>
 
           {message && (
             <div
-              className={`p-4 rounded-lg ${message.includes("success") ? "bg-green-50 text-green-700" : "bg-red-50 text-red-700"}`}
+              className={`p-4 rounded-lg ${message.startsWith("Failed") ? "bg-red-50 text-red-700" : "bg-green-50 text-green-700"}`}
             >
               {message}
             </div>
@@ -69,10 +109,10 @@ export default function ImportPage() {
 
           <button
             type="submit"
-            disabled={!file || uploading}
+            disabled={files.length === 0 || uploading}
             className="w-full py-2 px-4 border border-transparent rounded-md shadow-sm text-sm font-medium text-white bg-indigo-600 hover:bg-indigo-700 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-indigo-500 disabled:opacity-50 disabled:cursor-not-allowed"
           >
-            {uploading ? "Uploading..." : "Upload Invoice"}
+            {uploading ? "Processing..." : "Upload Invoices"}
           </button>
         </form>
       </div>